@@ -1,18 +1,85 @@
 import json
 import sqlite3
+import threading
 from pathlib import Path
 import re
 
 DB_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "database.db"
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+# ---------- Connection manager ----------
+# Every thread keeps one long-lived connection per database file. Reusing the
+# connection avoids the connect/pragma cost on every helper call and lets
+# sqlite3's per-connection statement cache reuse prepared statements, since
+# all helpers below issue constant SQL strings. Streamlit runs every rerun on
+# a fresh thread, so the connections of threads that have ended are closed
+# whenever a new thread opens its first one.
+BUSY_TIMEOUT_MS = 10_000
+CACHED_STATEMENTS = 256
+CACHE_SIZE_KIB = 16_384
+
+_local = threading.local()
+_threads_lock = threading.Lock()
+_thread_connections: "dict[threading.Thread, dict[Path, sqlite3.Connection]]" = {}
+
+
+def _open_connection(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        # only its own thread uses it; another one may close it once that ended
+        check_same_thread=False,
+    )
     conn.row_factory = sqlite3.Row
+    # WAL lets the chat page keep reading and writing while background
+    # EPITOME evaluations commit; NORMAL sync is durable enough under WAL.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
+
+def get_connection(db_path: Path | None = None) -> sqlite3.Connection:
+    """
+    Return this thread's connection to ``db_path`` (defaults to ``DB_PATH``).
+
+    Use it as ``with get_connection() as conn:`` – the block commits or rolls
+    back the transaction but keeps the connection open for reuse.
+    """
+    path = Path(db_path or DB_PATH)
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+        with _threads_lock:
+            _close_finished_threads()
+            _thread_connections[threading.current_thread()] = connections
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _open_connection(path)
+    return conn
+
+
+def _close_finished_threads() -> None:
+    for thread in [t for t in _thread_connections if not t.is_alive()]:
+        for conn in _thread_connections.pop(thread).values():
+            conn.close()
+
+
+def close_connections() -> None:
+    """Close all connections opened by the current thread."""
+    for conn in (getattr(_local, "connections", None) or {}).values():
+        conn.close()
+    _local.connections = None
+    with _threads_lock:
+        _thread_connections.pop(threading.current_thread(), None)
+
+
 # ---------- Prompt helpers ----------
 def create_prompt(version_name: str, prompt_text: str, activate: bool = True):
-    with sqlite3.connect(DB_PATH) as con:
+    with get_connection() as con:
         cur = con.cursor()
         if activate:
             cur.execute("UPDATE prompt_versions SET is_active = 0 WHERE is_active = 1")
@@ -22,14 +89,14 @@ def create_prompt(version_name: str, prompt_text: str, activate: bool = True):
         )
 
 def list_prompts():
-    with sqlite3.connect(DB_PATH) as con:
+    with get_connection() as con:
         cur = con.cursor()
         return cur.execute(
             "SELECT id, version_name, created_at, is_active FROM prompt_versions ORDER BY created_at DESC"
         ).fetchall()
 
 def get_prompt_text(prompt_id: int):
-    with sqlite3.connect(DB_PATH) as con:
+    with get_connection() as con:
         cur = con.cursor()
         row = cur.execute(
             "SELECT prompt_text FROM prompt_versions WHERE id = ?", (prompt_id,)
@@ -37,23 +104,52 @@ def get_prompt_text(prompt_id: int):
         return row[0] if row else ""
 
 def set_active_prompt(prompt_id: int):
-    with sqlite3.connect(DB_PATH) as con:
+    with get_connection() as con:
         cur = con.cursor()
         cur.execute("UPDATE prompt_versions SET is_active = 0 WHERE is_active = 1")
         cur.execute("UPDATE prompt_versions SET is_active = 1 WHERE id = ?", (prompt_id,))
 
-def get_active_prompt():
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        row = cur.execute(
-            "SELECT prompt_text FROM prompt_versions WHERE is_active = 1 LIMIT 1"
+# In-process copy of the active prompt, tagged with the prompt generation it
+# was read at. app_meta.prompt_generation is bumped by triggers on every
+# write to prompt_versions (any process), so checking it is enough to know
+# the copy is still current.
+_active_prompt_cache = {"generation": None, "value": (None, "")}
+_active_prompt_lock = threading.Lock()
+
+
+def get_active_prompt_version() -> tuple:
+    """
+    (id, prompt_text) of the active prompt, or (None, "") if none is active.
+    Both come from the same row, so a reply is never attributed to another
+    version than the text it was generated with.
+    """
+    with get_connection() as con:
+        row = con.execute(
+            "SELECT value FROM app_meta WHERE key = 'prompt_generation'"
         ).fetchone()
-        return row[0] if row else ""
+        generation = row[0] if row else None
+        with _active_prompt_lock:
+            if generation is not None and _active_prompt_cache["generation"] == generation:
+                return _active_prompt_cache["value"]
+        # one statement, so generation and prompt row are read from one snapshot
+        row = con.execute("""
+            SELECT (SELECT value FROM app_meta WHERE key = 'prompt_generation'), id, prompt_text
+            FROM (SELECT 1)
+            LEFT JOIN prompt_versions ON is_active = 1
+            ORDER BY id DESC
+            LIMIT 1
+        """).fetchone()
+    value = (row[1], row[2]) if row[1] is not None else (None, "")
+    with _active_prompt_lock:
+        _active_prompt_cache["generation"] = row[0]
+        _active_prompt_cache["value"] = value
+    return value
+
+def get_active_prompt():
+    return get_active_prompt_version()[1]
 
 def get_active_prompt_id() -> int | None:
-    with sqlite3.connect(DB_PATH) as con:
-        row = con.execute("SELECT id FROM prompt_versions WHERE is_active = 1 LIMIT 1" ).fetchone()
-        return row[0] if row else None
+    return get_active_prompt_version()[0]
 
 
 def create_tables():
@@ -92,25 +188,395 @@ def create_tables():
 
         conn.commit()
 
+    _run_migrations()
+
+
+# ---------- Schema migrations ----------
+EPITOME_CATEGORIES = ("emotional_reactions", "interpretations", "explorations")
+
+
+def _epitome_scores(epitome_eval) -> tuple:
+    """Pull the three EPITOME scores out of an evaluation dict or JSON string."""
+    if isinstance(epitome_eval, str):
+        try:
+            epitome_eval = json.loads(epitome_eval)
+        except json.JSONDecodeError:
+            return None, None, None
+    if not isinstance(epitome_eval, dict):
+        return None, None, None
+    scores = []
+    for category in EPITOME_CATEGORIES:
+        try:
+            scores.append(int(epitome_eval[category]["score"]))
+        except (KeyError, TypeError, ValueError):
+            scores.append(None)
+    return tuple(scores)
+
+
+def _parse_rating(user_feedback) -> int | None:
+    """Numeric 1–5 rating from feedback stored as ``4``, ``"4"`` or ``"Rating: 4/5"``."""
+    if user_feedback is None:
+        return None
+    match = re.fullmatch(r"\s*(?:Rating:\s*)?([1-5])(?:/5)?\s*", str(user_feedback))
+    if not match:
+        match = re.search(r"Rating:\s*([1-5])/5", str(user_feedback))
+    return int(match.group(1)) if match else None
+
+
+def _resolve_duplicate_pairs(conn: sqlite3.Connection) -> None:
+    """
+    Make (chat_id, pair_number) unique without losing study data. Rows with
+    the same key and the same messages are merged into the oldest one, which
+    takes the newest non-NULL evaluation, feedback and prompt_id of the
+    group. Rows with the same key but different messages keep their content
+    and are renumbered after the chat's last pair.
+    """
+    rows = conn.execute("""
+        SELECT id, chat_id, pair_number, user_input, llm_response, epitome_eval, user_feedback, prompt_id
+        FROM chat_pairs
+        WHERE (chat_id, pair_number) IN (
+            SELECT chat_id, pair_number FROM chat_pairs
+            GROUP BY chat_id, pair_number HAVING COUNT(*) > 1
+        )
+        ORDER BY id
+    """).fetchall()
+    groups: dict = {}
+    for row in rows:
+        groups.setdefault((row["chat_id"], row["pair_number"]), []).append(row)
+
+    next_number: dict = {}
+    for (chat_id, pair_number), group in groups.items():
+        by_content: dict = {}
+        for row in group:
+            by_content.setdefault((row["user_input"], row["llm_response"]), []).append(row)
+
+        for copies in by_content.values():
+            if len(copies) < 2:
+                continue
+            keep = copies[0]
+
+            def newest(column):
+                return next((r[column] for r in reversed(copies) if r[column] is not None), None)
+
+            conn.execute(
+                "UPDATE chat_pairs SET epitome_eval = ?, user_feedback = ?, prompt_id = ? WHERE id = ?",
+                (newest("epitome_eval"), newest("user_feedback"), newest("prompt_id"), keep["id"]),
+            )
+            conn.executemany(
+                "DELETE FROM chat_pairs WHERE id = ?", [(r["id"],) for r in copies[1:]]
+            )
+            print(f"[migration] merged {len(copies)} identical rows of {chat_id}/{pair_number}")
+
+        # distinct messages under one number: the oldest keeps it
+        for copies in list(by_content.values())[1:]:
+            if chat_id not in next_number:
+                next_number[chat_id] = conn.execute(
+                    "SELECT MAX(pair_number) FROM chat_pairs WHERE chat_id = ?", (chat_id,)
+                ).fetchone()[0] + 1
+            conn.execute(
+                "UPDATE chat_pairs SET pair_number = ? WHERE id = ?",
+                (next_number[chat_id], copies[0]["id"]),
+            )
+            print(f"[migration] renumbered {chat_id}/{pair_number} (id {copies[0]['id']}) "
+                  f"to {next_number[chat_id]}")
+            next_number[chat_id] += 1
+
+
+def _migration_1_indexes_and_scores(conn: sqlite3.Connection) -> None:
+    """Hot-path indexes, unique (chat_id, pair_number) and typed score columns."""
+    # A unique index cannot be built over duplicates.
+    _resolve_duplicate_pairs(conn)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_pairs_chat_pair
+        ON chat_pairs (chat_id, pair_number)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_pairs_feedback_ts
+        ON chat_pairs (timestamp) WHERE user_feedback IS NOT NULL
+    """)
+
+    existing = {c[1] for c in conn.execute("PRAGMA table_info(chat_pairs)")}
+    for column in ("er_score", "ip_score", "ex_score", "feedback_rating"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE chat_pairs ADD COLUMN {column} INTEGER")
+
+    rows = conn.execute("""
+        SELECT id, epitome_eval, user_feedback FROM chat_pairs
+        WHERE epitome_eval IS NOT NULL OR user_feedback IS NOT NULL
+    """).fetchall()
+    conn.executemany(
+        "UPDATE chat_pairs SET er_score = ?, ip_score = ?, ex_score = ?, feedback_rating = ? WHERE id = ?",
+        [
+            (*_epitome_scores(row["epitome_eval"]), _parse_rating(row["user_feedback"]), row["id"])
+            for row in rows
+        ],
+    )
+
+
+_PROMPT_STATS_DELTA = """
+    UPDATE prompt_stats SET
+        pairs      = pairs      {op} 1,
+        er_sum     = er_sum     {op} COALESCE({row}.er_score, 0),
+        er_n       = er_n       {op} ({row}.er_score IS NOT NULL),
+        ip_sum     = ip_sum     {op} COALESCE({row}.ip_score, 0),
+        ip_n       = ip_n       {op} ({row}.ip_score IS NOT NULL),
+        ex_sum     = ex_sum     {op} COALESCE({row}.ex_score, 0),
+        ex_n       = ex_n       {op} ({row}.ex_score IS NOT NULL),
+        rating_sum = rating_sum {op} COALESCE({row}.feedback_rating, 0),
+        rating_n   = rating_n   {op} ({row}.feedback_rating IS NOT NULL)
+    WHERE prompt_id = COALESCE({row}.prompt_id, 0);
+"""
+_PROMPT_STATS_ENSURE = "INSERT OR IGNORE INTO prompt_stats (prompt_id) VALUES (COALESCE({row}.prompt_id, 0));"
+
+
+def rebuild_prompt_stats(conn: sqlite3.Connection | None = None) -> None:
+    """
+    Recompute prompt_stats from scratch (the triggers keep it current afterwards).
+    With ``conn`` the caller owns the transaction; without, it is committed here.
+    """
+    if conn is None:
+        with get_connection() as own:
+            rebuild_prompt_stats(own)
+        return
+    conn.execute("DELETE FROM prompt_stats")
+    conn.execute("""
+        INSERT INTO prompt_stats
+            (prompt_id, pairs, er_sum, er_n, ip_sum, ip_n, ex_sum, ex_n, rating_sum, rating_n)
+        SELECT COALESCE(prompt_id, 0), COUNT(*),
+               COALESCE(SUM(er_score), 0), COUNT(er_score),
+               COALESCE(SUM(ip_score), 0), COUNT(ip_score),
+               COALESCE(SUM(ex_score), 0), COUNT(ex_score),
+               COALESCE(SUM(feedback_rating), 0), COUNT(feedback_rating)
+        FROM chat_pairs
+        GROUP BY COALESCE(prompt_id, 0)
+    """)
+
+
+def _migration_2_prompt_stats(conn: sqlite3.Connection) -> None:
+    """Per-prompt running sums for the dashboard, maintained by triggers."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS prompt_stats (
+            prompt_id  INTEGER PRIMARY KEY,   -- 0 = pairs without a prompt_id
+            pairs      INTEGER NOT NULL DEFAULT 0,
+            er_sum     INTEGER NOT NULL DEFAULT 0,
+            er_n       INTEGER NOT NULL DEFAULT 0,
+            ip_sum     INTEGER NOT NULL DEFAULT 0,
+            ip_n       INTEGER NOT NULL DEFAULT 0,
+            ex_sum     INTEGER NOT NULL DEFAULT 0,
+            ex_n       INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            rating_n   INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    add_new = _PROMPT_STATS_ENSURE.format(row="NEW") + _PROMPT_STATS_DELTA.format(op="+", row="NEW")
+    remove_old = _PROMPT_STATS_DELTA.format(op="-", row="OLD")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_prompt_stats_insert AFTER INSERT ON chat_pairs
+        BEGIN {add_new} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_prompt_stats_delete AFTER DELETE ON chat_pairs
+        BEGIN {remove_old} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_prompt_stats_update
+        AFTER UPDATE OF prompt_id, er_score, ip_score, ex_score, feedback_rating ON chat_pairs
+        BEGIN {remove_old} {add_new} END
+    """)
+    rebuild_prompt_stats(conn)
+
+
+def _migration_3_chunk_translations(conn: sqlite3.Connection) -> None:
+    """Side table of translated RAG chunks, keyed by chunk content hash."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_translations (
+            chunk_hash      TEXT NOT NULL,
+            target_lang     TEXT NOT NULL,
+            model           TEXT NOT NULL,
+            translated_text TEXT NOT NULL,
+            created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (chunk_hash, target_lang, model)
+        )
+    """)
+
+
+def _migration_4_epitome_jobs(conn: sqlite3.Connection) -> None:
+    """Durable queue of pending EPITOME evaluations (see services/epitome_queue.py)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS epitome_jobs (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id      TEXT NOT NULL,
+            pair_number  INTEGER NOT NULL,
+            user_input   TEXT NOT NULL,
+            llm_response TEXT NOT NULL,
+            status       TEXT NOT NULL DEFAULT 'pending'
+                         CHECK (status IN ('pending', 'running', 'done', 'dead')),
+            attempts     INTEGER NOT NULL DEFAULT 0,
+            next_run_at  REAL NOT NULL DEFAULT 0,
+            last_error   TEXT,
+            created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (chat_id, pair_number)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_epitome_jobs_due
+        ON epitome_jobs (status, next_run_at)
+    """)
+
+
+def _migration_5_chat_pairs_keyset_index(conn: sqlite3.Connection) -> None:
+    """Index for keyset pagination over chat pairs (see get_chat_pairs_page)."""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_pairs_ts_id
+        ON chat_pairs (timestamp, id)
+    """)
+
+
+def _migration_6_prompt_generation(conn: sqlite3.Connection) -> None:
+    """Generation counter that invalidates the in-process active prompt cache."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key   TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('prompt_generation', 0)")
+    bump = "UPDATE app_meta SET value = value + 1 WHERE key = 'prompt_generation';"
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_prompt_versions_{event.lower()}
+            AFTER {event} ON prompt_versions
+            BEGIN {bump} END
+        """)
+
+
+# MIGRATIONS[i] upgrades the schema from version i to i + 1 (PRAGMA user_version).
+MIGRATIONS = [
+    _migration_1_indexes_and_scores,
+    _migration_2_prompt_stats,
+    _migration_3_chunk_translations,
+    _migration_4_epitome_jobs,
+    _migration_5_chat_pairs_keyset_index,
+    _migration_6_prompt_generation,
+]
+
+
+def _run_migrations() -> None:
+    conn = get_connection()
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+    # Take the write lock before re-reading the version so concurrent
+    # processes cannot apply the same migration twice.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(version + 1, len(MIGRATIONS) + 1):
+            MIGRATIONS[target - 1](conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
 
 def insert_chat_pair(chat_id, pair_number, user_input, llm_response, prompt_id=None, epitome_eval=None, user_feedback=None):
+    if isinstance(epitome_eval, dict):
+        epitome_eval = json.dumps(epitome_eval)
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO chat_pairs (chat_id, pair_number, user_input, llm_response, prompt_id, epitome_eval, user_feedback)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO chat_pairs (chat_id, pair_number, user_input, llm_response, prompt_id, epitome_eval, user_feedback,
+                                    er_score, ip_score, ex_score, feedback_rating)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             chat_id,
             pair_number,
             user_input,
             llm_response,
             prompt_id,
-            str(epitome_eval) if epitome_eval else None,
+            epitome_eval or None,
             user_feedback,
-
+            *_epitome_scores(epitome_eval),
+            _parse_rating(user_feedback),
         ))
         conn.commit()
 
+def _chat_pairs_filter(
+    prompt_version: str | None = None,
+    missing_eval: bool = False,
+    min_rating: int | None = None,
+    max_rating: int | None = None,
+) -> tuple:
+    clauses, params = [], []
+    if prompt_version is not None:
+        clauses.append("prompt_id IN (SELECT id FROM prompt_versions WHERE version_name = ?)")
+        params.append(prompt_version)
+    if missing_eval:
+        clauses.append("epitome_eval IS NULL")
+    if min_rating is not None:
+        clauses.append("feedback_rating >= ?")
+        params.append(min_rating)
+    if max_rating is not None:
+        clauses.append("feedback_rating <= ?")
+        params.append(max_rating)
+    return clauses, params
+
+
+def get_chat_pairs_page(
+    limit: int = 50,
+    after: tuple | None = None,
+    prompt_version: str | None = None,
+    missing_eval: bool = False,
+    min_rating: int | None = None,
+    max_rating: int | None = None,
+) -> tuple:
+    """
+    One page of chat pairs, newest first, using keyset pagination on
+    (timestamp, id): pass the returned cursor as ``after`` to get the next
+    page. Returns (rows, next_cursor); next_cursor is None on the last page.
+    Filters: prompt version name, pairs without EPITOME evaluation, and a
+    feedback rating range (pairs without a rating are excluded then).
+    """
+    clauses, params = _chat_pairs_filter(prompt_version, missing_eval, min_rating, max_rating)
+    if after is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT id, chat_id, pair_number, user_input, llm_response, epitome_eval,
+                   user_feedback, timestamp, prompt_id,
+                   er_score, ip_score, ex_score, feedback_rating
+            FROM chat_pairs
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        """, (*params, limit + 1)).fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1]["timestamp"], rows[-1]["id"])
+    return rows, None
+
+
+def count_chat_pairs(
+    prompt_version: str | None = None,
+    missing_eval: bool = False,
+    min_rating: int | None = None,
+    max_rating: int | None = None,
+) -> int:
+    clauses, params = _chat_pairs_filter(prompt_version, missing_eval, min_rating, max_rating)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with get_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM chat_pairs {where}", params).fetchone()[0]
+
+
+def list_prompt_version_names():
+    with get_connection() as conn:
+        rows = conn.execute("SELECT DISTINCT version_name FROM prompt_versions ORDER BY version_name").fetchall()
+        return [row[0] for row in rows]
+
+
 def get_recent_pairs(chat_id: str, limit: int = 5):
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -129,50 +595,39 @@ def update_user_feedback(chat_id: str, pair_number: int, user_feedback: str):
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE chat_pairs
-            SET user_feedback = ?
+            SET user_feedback = ?, feedback_rating = ?
             WHERE chat_id = ? AND pair_number = ?
-        """, (user_feedback, chat_id, pair_number))
+        """, (user_feedback, _parse_rating(user_feedback), chat_id, pair_number))
         conn.commit()
 
 
 def get_feedback_statistics():
-    """Get feedback statistics from the user_feedback field"""
+    """Get feedback statistics from the numeric feedback_rating column"""
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT user_feedback 
-            FROM chat_pairs 
-            WHERE user_feedback IS NOT NULL 
-            AND user_feedback LIKE 'Rating:%'
+            SELECT feedback_rating, COUNT(*) AS n
+            FROM chat_pairs
+            WHERE feedback_rating IS NOT NULL
+            GROUP BY feedback_rating
         """)
 
-        feedback_rows = cursor.fetchall()
+        rating_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        for row in cursor.fetchall():
+            rating_counts[row['feedback_rating']] = row['n']
 
-        if not feedback_rows:
+        total = sum(rating_counts.values())
+        if not total:
             return {
                 'total_feedback': 0,
                 'avg_rating': 0,
                 'rating_counts': {}
             }
 
-        ratings = []
-        rating_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-
-        # Extract ratings from feedback text
-        for row in feedback_rows:
-            feedback_text = row['user_feedback']
-            # Extract rating using regex: "Rating: X/5"
-            match = re.search(r'Rating: (\d)/5', feedback_text)
-            if match:
-                rating = int(match.group(1))
-                if 1 <= rating <= 5:
-                    ratings.append(rating)
-                    rating_counts[rating] += 1
-
-        avg_rating = sum(ratings) / len(ratings) if ratings else 0
+        avg_rating = sum(rating * n for rating, n in rating_counts.items()) / total
 
         return {
-            'total_feedback': len(ratings),
+            'total_feedback': total,
             'avg_rating': round(avg_rating, 2),
             'rating_counts': rating_counts
         }
@@ -205,12 +660,142 @@ def get_chat_feedback_summary(chat_id: str):
         return cursor.fetchall()
 
 
+def _set_epitome_eval(conn: sqlite3.Connection, chat_id: str, pair_number: int, epitome_eval_json: dict):
+    conn.execute("""
+        UPDATE chat_pairs
+        SET epitome_eval = ?, er_score = ?, ip_score = ?, ex_score = ?
+        WHERE chat_id = ? AND pair_number = ?
+    """, (json.dumps(epitome_eval_json), *_epitome_scores(epitome_eval_json), chat_id, pair_number))
+
+
 def update_epitome_eval(chat_id: str, pair_number: int, epitome_eval_json: dict):
+    with get_connection() as conn:
+        _set_epitome_eval(conn, chat_id, pair_number, epitome_eval_json)
+        conn.commit()
+
+
+def get_prompt_stats():
+    """Per-prompt-version averages read from the materialized prompt_stats table"""
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            UPDATE chat_pairs
-            SET epitome_eval = ?
-            WHERE chat_id = ? AND pair_number = ?
-        """, (json.dumps(epitome_eval_json), chat_id, pair_number))
+            SELECT pv.version_name,
+                   pv.prompt_text,
+                   MAX(pv.id)                                   AS latest_prompt_id,
+                   SUM(ps.pairs)                                AS pairs,
+                   SUM(ps.er_sum) * 1.0 / NULLIF(SUM(ps.er_n), 0)         AS avg_er,
+                   SUM(ps.ip_sum) * 1.0 / NULLIF(SUM(ps.ip_n), 0)         AS avg_ip,
+                   SUM(ps.ex_sum) * 1.0 / NULLIF(SUM(ps.ex_n), 0)         AS avg_ex,
+                   SUM(ps.rating_sum) * 1.0 / NULLIF(SUM(ps.rating_n), 0) AS avg_feedback
+            FROM prompt_stats ps
+            JOIN prompt_versions pv ON pv.id = ps.prompt_id
+            GROUP BY pv.version_name
+            ORDER BY latest_prompt_id
+        """)
+        return cursor.fetchall()
+
+
+# ---------- Chunk translation helpers ----------
+def get_chunk_translations(chunk_hashes, target_lang: str, model: str) -> dict:
+    """Return {chunk_hash: translated_text} for the hashes that are cached."""
+    chunk_hashes = list(chunk_hashes)
+    if not chunk_hashes:
+        return {}
+    placeholders = ",".join("?" * len(chunk_hashes))
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT chunk_hash, translated_text
+            FROM chunk_translations
+            WHERE target_lang = ? AND model = ? AND chunk_hash IN ({placeholders})
+        """, (target_lang, model, *chunk_hashes)).fetchall()
+        return {row["chunk_hash"]: row["translated_text"] for row in rows}
+
+
+def save_chunk_translations(translations: dict, target_lang: str, model: str):
+    """Store {chunk_hash: translated_text}."""
+    with get_connection() as conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO chunk_translations (chunk_hash, target_lang, model, translated_text)
+            VALUES (?, ?, ?, ?)
+        """, [(h, target_lang, model, text) for h, text in translations.items()])
+
+
+# ---------- EPITOME job queue helpers ----------
+def enqueue_epitome_job(chat_id: str, pair_number: int, user_input: str, llm_response: str) -> int:
+    """Queue a pair for evaluation; re-queuing the same pair resets its job."""
+    with get_connection() as conn:
+        conn.execute("""
+            INSERT INTO epitome_jobs (chat_id, pair_number, user_input, llm_response)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (chat_id, pair_number) DO UPDATE SET
+                user_input = excluded.user_input,
+                llm_response = excluded.llm_response,
+                status = 'pending', attempts = 0, next_run_at = 0, last_error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+        """, (chat_id, pair_number, user_input, llm_response))
+        return conn.execute(
+            "SELECT id FROM epitome_jobs WHERE chat_id = ? AND pair_number = ?", (chat_id, pair_number)
+        ).fetchone()[0]
+
+
+def claim_epitome_jobs(limit: int, now: float) -> list:
+    """Atomically mark up to ``limit`` due pending jobs as running and return them."""
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute("""
+            SELECT id, chat_id, pair_number, user_input, llm_response, attempts
+            FROM epitome_jobs
+            WHERE status = 'pending' AND next_run_at <= ?
+            ORDER BY next_run_at, id
+            LIMIT ?
+        """, (now, limit)).fetchall()
+        conn.executemany("""
+            UPDATE epitome_jobs
+            SET status = 'running', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, [(row["id"],) for row in rows])
         conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+
+def complete_epitome_job(job_id: int, chat_id: str, pair_number: int, epitome_eval_json: dict):
+    """Store the evaluation and close the job in one transaction."""
+    with get_connection() as conn:
+        _set_epitome_eval(conn, chat_id, pair_number, epitome_eval_json)
+        conn.execute("""
+            UPDATE epitome_jobs
+            SET status = 'done', last_error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (job_id,))
+
+
+def fail_epitome_job(job_id: int, error: str, retry_at: float | None):
+    """Reschedule a failed job at ``retry_at``, or dead-letter it if that is None."""
+    with get_connection() as conn:
+        conn.execute("""
+            UPDATE epitome_jobs
+            SET status = ?, next_run_at = COALESCE(?, next_run_at), last_error = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, ("pending" if retry_at is not None else "dead", retry_at, error, job_id))
+
+
+def recover_epitome_jobs() -> int:
+    """Put jobs left 'running' by a previous process back into the queue."""
+    with get_connection() as conn:
+        return conn.execute("""
+            UPDATE epitome_jobs
+            SET status = 'pending', next_run_at = 0, updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running'
+        """).rowcount
+
+
+def get_epitome_job_counts() -> dict:
+    """Number of EPITOME queue jobs per status ('pending', 'running', 'done', 'dead')."""
+    with get_connection() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM epitome_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
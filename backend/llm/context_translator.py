@@ -0,0 +1,99 @@
+# backend/llm/context_translator.py
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.database.db import get_chunk_translations, save_chunk_translations
+from backend.llm.doc_manifest import chunk_hash
+from backend.llm.prompt_budget import count_tokens
+from backend.llm.replicate_pool import get_replicate_client, replicate_slot
+from backend.utils.metrics import metrics
+
+LANGUAGE_NAMES = {"en": "English", "de": "German"}
+
+
+class ContextTranslator:
+    """
+    Translates RAG chunks once and serves them from the chunk_translations
+    table afterwards, so a chat turn only pays for chunks it has never seen.
+    """
+    MAX_WORKERS = 5
+    MAX_COMPLETION_TOKENS = 512
+
+    def __init__(
+            self,
+            model: str,
+            api_token: Optional[str] = None,
+            timeout: Optional[Tuple[float, float]] = None,
+            max_completion_tokens: Optional[int] = None,
+    ) -> None:
+        # same client settings as the chatbot that owns this translator
+        self.model = model
+        self.api_token = api_token
+        self.timeout = timeout
+        self.max_completion_tokens = max_completion_tokens or self.MAX_COMPLETION_TOKENS
+
+    def _translate_one(self, text: str, target_lang: str) -> str:
+        payload = {
+            "prompt": text,
+            "system_prompt": (
+                "You are a translation assistant. "
+                f"Translate this text into clear {LANGUAGE_NAMES.get(target_lang, target_lang)}, "
+                "preserving meaning but dropping any German-specific formatting. "
+                "Reply with the translation only."
+            ),
+            "temperature": 0.0,
+            "top_p": 1.0,
+            "max_completion_tokens": self.max_completion_tokens,
+        }
+        translated = ""
+        with replicate_slot(), metrics.track("translate", self.model) as call:
+            call.input_tokens = count_tokens(payload["system_prompt"]) + count_tokens(text)
+            for event in get_replicate_client(self.api_token, self.timeout).stream(self.model, input=payload):
+                chunk = str(event)  # "" for anything but output events
+                if chunk:
+                    call.first_token()
+                    translated += chunk
+            call.output_tokens = count_tokens(translated)
+        return translated.strip()
+
+    def translate(self, chunks: List[str], target_lang: str = "en") -> List[str]:
+        """Return ``chunks`` translated into ``target_lang``, in the same order."""
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        cached = get_chunk_translations(set(hashes), target_lang, self.model)
+
+        missing: Dict[str, str] = {}
+        for h, chunk in zip(hashes, chunks):
+            if h not in cached:
+                missing[h] = chunk
+        if missing:
+            cached.update(self.translate_missing(missing, target_lang))
+        return [cached[h] for h in hashes]
+
+    def translate_missing(self, chunks_by_hash: Dict[str, str], target_lang: str) -> Dict[str, str]:
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+            results = pool.map(lambda text: self._translate_one(text, target_lang), chunks_by_hash.values())
+            translated = dict(zip(chunks_by_hash.keys(), results))
+        save_chunk_translations(translated, target_lang, self.model)
+        return translated
+
+    def prefill(self, chunks: Iterable[str], target_lang: str = "en", batch_size: int = 50) -> int:
+        """Translate and store every chunk not cached yet; returns how many were translated."""
+        done = 0
+        batch: Dict[str, str] = {}
+
+        def flush() -> int:
+            known = get_chunk_translations(batch.keys(), target_lang, self.model)
+            todo = {h: text for h, text in batch.items() if h not in known}
+            if todo:
+                self.translate_missing(todo, target_lang)
+            batch.clear()
+            return len(todo)
+
+        for chunk in chunks:
+            batch[chunk_hash(chunk)] = chunk
+            if len(batch) >= batch_size:
+                done += flush()
+        if batch:
+            done += flush()
+        return done
@@ -0,0 +1,213 @@
+# backend/llm/doc_manifest.py
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+MANIFEST_VERSION = 2
+SUPPORTED_SUFFIXES = (".pdf", ".json")
+
+# progress_callback(pages_done, total_pages, chunks_embedded)
+SyncProgressCallback = Callable[[int, int, int], None]
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SyncResult(NamedTuple):
+    name: str
+    added: int
+    removed: int
+    kept: int
+    unchanged: bool
+    error: Optional[Exception] = None
+
+
+class DocManifest:
+    """
+    Record of what is in the vector store, per source file: the SHA-256 of
+    the file, the embedding model and chunking it was indexed with, and the
+    primary keys of its chunks grouped by chunk hash.
+
+    A v1 manifest (a plain list of filenames) is read as entries without
+    chunk ids; such files are re-indexed from scratch on their next sync.
+    """
+
+    def __init__(self, path: Path, files: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.path = Path(path)
+        self.files: Dict[str, Dict[str, Any]] = files or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "DocManifest":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(data, list):
+            return cls(path, {name: {"sha256": None, "chunks": None} for name in data})
+        return cls(path, data.get("files", {}))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": self.files}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+    def names(self) -> List[str]:
+        return sorted(self.files)
+
+
+def index_settings(retriever) -> Dict[str, Any]:
+    """Everything besides the file content that determines the stored vectors."""
+    return {
+        "embedding_model": retriever.embedding_model_name,
+        "chunk_size": retriever.CHUNK_SIZE,
+        "chunk_overlap": retriever.CHUNK_OVERLAP,
+    }
+
+
+def sync_file(
+        retriever,
+        manifest: DocManifest,
+        path: Path,
+        progress_callback: Optional[SyncProgressCallback] = None,
+) -> SyncResult:
+    """
+    Bring the vectors of one file in line with its current content. The file
+    is streamed: chunks whose hash is already indexed keep their ids, new
+    ones are embedded and inserted in ``INGEST_BATCH_SIZE`` batches, and
+    chunks that disappeared are deleted. A different embedding model
+    re-embeds the whole file; a different chunking simply shows up as
+    changed chunk hashes.
+
+    Before the first insert the entry is saved without chunk ids, so if the
+    process dies mid-sync the next sync deletes the file's vectors by source
+    and starts over instead of leaving orphans behind.
+    """
+    path = Path(path)
+    name = path.name
+    entry = manifest.files.get(name)
+    settings = index_settings(retriever)
+    digest = file_sha256(path)
+
+    if (
+        entry is not None
+        and entry.get("chunks") is not None
+        and entry.get("sha256") == digest
+        and all(entry.get(key) == value for key, value in settings.items())
+    ):
+        kept = sum(len(ids) for ids in entry["chunks"].values())
+        return SyncResult(name, 0, 0, kept, True)
+
+    if entry is None:
+        old_chunks: Dict[str, List[int]] = {}
+    elif entry.get("chunks") is None:
+        # v1 entry or interrupted sync: the ids of its chunks are unknown, so start over
+        retriever.delete_source(name)
+        old_chunks = {}
+    else:
+        old_chunks = entry["chunks"]
+
+    stale_ids: List[int] = []
+    if entry is not None and entry.get("embedding_model") not in (None, settings["embedding_model"]):
+        stale_ids = [pk for ids in old_chunks.values() for pk in ids]
+        old_chunks = {}
+
+    reusable = {h: list(ids) for h, ids in old_chunks.items()}
+    chunks: Dict[str, List[int]] = {}
+    new_hashes: List[str] = []
+    pages = [0, 1]
+
+    def on_page(pages_done: int, total_pages: int) -> None:
+        pages[:] = [pages_done, total_pages]
+
+    def new_chunks() -> Iterator[str]:
+        for chunk in retriever.iter_file_chunks(str(path), on_page):
+            h = chunk_hash(chunk)
+            ids = chunks.setdefault(h, [])
+            if reusable.get(h):
+                ids.append(reusable[h].pop(0))
+            else:
+                new_hashes.append(h)
+                yield chunk
+
+    def on_batch(count: int) -> None:
+        if progress_callback:
+            progress_callback(pages[0], pages[1], count)
+
+    manifest.files[name] = {**(entry or {}), "sha256": None, "chunks": None}
+    manifest.save()
+    try:
+        # insert before deleting, so a failed embed leaves the previous version
+        # searchable (add_chunks removes its own partial inserts on errors)
+        new_ids = retriever.add_chunks(new_chunks(), name, {"file_type": path.suffix.lower()}, on_batch)
+    except Exception:
+        if entry is None:
+            manifest.files.pop(name, None)
+        else:
+            manifest.files[name] = entry
+        manifest.save()
+        raise
+
+    on_batch(len(new_ids))  # the file is fully read now, even if nothing was new
+    for h, pk in zip(new_hashes, new_ids):
+        chunks[h].append(pk)
+    stale_ids.extend(pk for ids in reusable.values() for pk in ids)
+    retriever.delete_ids(stale_ids)
+
+    manifest.files[name] = {"sha256": digest, **settings, "chunks": chunks}
+    manifest.save()
+    kept = sum(len(ids) for ids in chunks.values()) - len(new_ids)
+    return SyncResult(name, len(new_ids), len(stale_ids), kept, False)
+
+
+def remove_file(retriever, manifest: DocManifest, name: str) -> int:
+    """Delete every vector of ``name`` and drop it from the manifest."""
+    entry = manifest.files.pop(name, None) or {}
+    removed = sum(len(ids) for ids in (entry.get("chunks") or {}).values())
+    # by source rather than by id, so rows from an interrupted sync go too
+    retriever.delete_source(name)
+    manifest.save()
+    return removed
+
+
+def sync_directory(
+        retriever,
+        manifest: DocManifest,
+        docs_dir: Path,
+        on_file: Optional[Callable[[Path], Optional[SyncProgressCallback]]] = None,
+) -> List[SyncResult]:
+    """
+    Sync every supported file in ``docs_dir`` and remove the vectors of
+    manifest entries whose file is gone. ``on_file(path)`` may return a
+    progress callback for that file. Errors are reported per file.
+    """
+    docs_dir = Path(docs_dir)
+    paths = sorted(p for p in docs_dir.glob("*") if p.suffix.lower() in SUPPORTED_SUFFIXES)
+    results = []
+    for path in paths:
+        progress_callback = on_file(path) if on_file else None
+        try:
+            results.append(sync_file(retriever, manifest, path, progress_callback))
+        except Exception as e:
+            results.append(SyncResult(path.name, 0, 0, 0, False, e))
+
+    on_disk = {p.name for p in paths}
+    for name in manifest.names():
+        if name not in on_disk:
+            results.append(SyncResult(name, 0, remove_file(retriever, manifest, name), 0, False))
+    return results
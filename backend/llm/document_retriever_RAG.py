@@ -1,84 +1,157 @@
-from pymilvus import (
-    connections,
-    FieldSchema, CollectionSchema,
-    DataType, Collection, utility
-)
-import numpy as np
 import os
 import json
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Callable, Iterable, Iterator
 import PyPDF2
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 
+from backend.llm.doc_manifest import DocManifest, SyncProgressCallback, sync_file
+from backend.llm.embedding_cache import EmbeddingCache, normalize_query
+from backend.llm.vector_store import VectorStore, create_vector_store
+
 
 class DocumentRetriever:
-    MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
-    MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
+    # "milvus" (default) or "local" for the in-process memory-mapped store
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "milvus")
+    # Milvus-style index/search params as JSON, e.g. the winner of
+    # scripts/benchmark_retrieval.py; unset means vector_store's defaults
+    INDEX_PARAMS = json.loads(os.getenv("RAG_INDEX_PARAMS", "null"))
+    SEARCH_PARAMS = json.loads(os.getenv("RAG_SEARCH_PARAMS", "null"))
     COLLECTION_NAME = "documents"
     EMBEDDING_MODEL = "intfloat/multilingual-e5-base"
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+    EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+    CHUNK_SIZE = 500
+    CHUNK_OVERLAP = 100
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+    # queries per encode call / multi-vector search in retrieve_batch
+    QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "64"))
 
     def __init__(
             self,
             embedding_model: Optional[str] = None,
             collection_name: Optional[str] = None,
+            embedding_cache: Optional[EmbeddingCache] = None,
+            vector_store: Optional[VectorStore] = None,
+            backend: Optional[str] = None,
+            index_params: Optional[Dict[str, Any]] = None,
+            search_params: Optional[Dict[str, Any]] = None,
     ) -> None:
         # 1) SentenceTransformer
-        self.model = SentenceTransformer(embedding_model or self.EMBEDDING_MODEL)
+        self.embedding_model_name = embedding_model or self.EMBEDDING_MODEL
+        self.model = SentenceTransformer(self.embedding_model_name)
         self.EMB_DIM = self.model.get_sentence_embedding_dimension()
+        self.embedding_cache = embedding_cache or EmbeddingCache(
+            max_size=self.EMBEDDING_CACHE_SIZE,
+            ttl=self.EMBEDDING_CACHE_TTL,
+        )
 
+        # 2) Vector store (Milvus collection or local memory-mapped index)
+        self.backend = backend or self.VECTOR_BACKEND
+        self.collection_name = collection_name or self.COLLECTION_NAME
+        self.index_params = index_params or self.INDEX_PARAMS
+        self.search_params = search_params or self.SEARCH_PARAMS
+        self.store = vector_store or self._create_store()
+        # loaded once here and after reset(); never again on the query path
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._ensure_loaded()
 
-        # 2) Connect to Milvus
-        connections.connect(alias="default", host=self.MILVUS_HOST, port=self.MILVUS_PORT)
+    def _create_store(self) -> VectorStore:
+        return create_vector_store(
+            self.backend, self.collection_name, self.EMB_DIM, self.index_params, self.search_params
+        )
 
-        # 3) Create collection if needed
-        name = collection_name or self.COLLECTION_NAME
-        if not utility.has_collection(name):
-            fields = [
-                FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=self.EMB_DIM),
-                FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
-                FieldSchema(name="source", dtype=DataType.VARCHAR, max_length=1000),
-                FieldSchema(name="metadata", dtype=DataType.VARCHAR, max_length=10000),
-            ]
-            schema = CollectionSchema(fields, description="Dokumente mit Embeddings")
-            Collection(name, schema)
-
-        self.collection = Collection(name)
-
-        # 4) Create Index, if not already there
-        indexes = [idx.field_name for idx in self.collection.indexes]
-        if "embedding" not in indexes:
-            self.collection.create_index(
-                field_name="embedding",
-                index_params={
-                    "index_type": "IVF_FLAT",
-                    "metric_type": "COSINE",
-                    "params": {"nlist": 128}
-                }
-            )
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.store.load()
+                self._loaded = True
+
+    def reset(self) -> None:
+        """Drop every stored vector and start over with an empty store."""
+        with self._load_lock:
+            self._loaded = False
+            self.store.drop()
+            self.store = self._create_store()
+        self._ensure_loaded()
 
-        self.collection.load()
+    def delete_source(self, source: str) -> None:
+        """Remove all chunks that were indexed from ``source``."""
+        self.store.delete_by_source(source)
+        self.store.flush()
 
-    def read_pdf(self, file_path: str) -> List[str]:
+    @classmethod
+    def iter_pdf_pages(cls, file_path: str) -> Iterator[str]:
+        """Yield the text of each PDF page in order, extracted by a worker pool."""
+        local = threading.local()
+        opened = []
+
+        def extract(page_index: int) -> str:
+            # PdfReader is not thread-safe, so every worker keeps its own reader.
+            if not hasattr(local, "reader"):
+                local.file = open(file_path, 'rb')
+                opened.append(local.file)
+                local.reader = PyPDF2.PdfReader(local.file)
+            return (local.reader.pages[page_index].extract_text() or "") + "\n"
+
+        with open(file_path, 'rb') as file:
+            total_pages = len(PyPDF2.PdfReader(file).pages)
+
+        window = cls.PDF_WORKERS * 2
+        try:
+            with ThreadPoolExecutor(max_workers=cls.PDF_WORKERS) as pool:
+                pending = deque()
+                next_page = 0
+                while next_page < total_pages or pending:
+                    # keep a bounded number of pages in flight so memory stays flat
+                    while next_page < total_pages and len(pending) < window:
+                        pending.append(pool.submit(extract, next_page))
+                        next_page += 1
+                    yield pending.popleft().result()
+        finally:
+            for file in opened:
+                file.close()
+
+    @classmethod
+    def iter_chunks(cls, texts: Iterable[str]) -> Iterator[str]:
+        """
+        Split a stream of text into overlapping chunks without ever holding
+        the whole document in memory. Produces the same chunks as slicing the
+        concatenated text in steps of ``CHUNK_SIZE - CHUNK_OVERLAP``.
+        """
+        step = cls.CHUNK_SIZE - cls.CHUNK_OVERLAP
+        buffer = ""
+        for text in texts:
+            buffer += text
+            while len(buffer) >= cls.CHUNK_SIZE:
+                chunk = buffer[:cls.CHUNK_SIZE].strip()
+                if chunk:
+                    yield chunk
+                buffer = buffer[step:]
+        for i in range(0, len(buffer), step):
+            chunk = buffer[i:i + cls.CHUNK_SIZE].strip()
+            if chunk:
+                yield chunk
+
+    @classmethod
+    def read_pdf(cls, file_path: str) -> List[str]:
         chunks = []
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                chunk_size = 500
-                overlap = 100
-                for i in range(0, len(text), chunk_size - overlap):
-                    chunk = text[i:i + chunk_size].strip()
-                    if chunk:
-                        chunks.append(chunk)
+            chunks = list(cls.iter_chunks(cls.iter_pdf_pages(file_path)))
         except Exception as e:
             print(f"Fehler beim Lesen der PDF-Datei {file_path}: {e}")
         return chunks
 
-    def read_json(self, file_path: str) -> List[str]:
+    @classmethod
+    def read_json(cls, file_path: str) -> List[str]:
         chunks = []
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
@@ -108,84 +181,252 @@ class DocumentRetriever:
             print(f"Fehler beim Lesen der JSON-Datei {file_path}: {e}")
         return chunks
 
-    def add_file(self, file_path: str) -> None:
+    @classmethod
+    def iter_file_chunks(
+            cls,
+            file_path: str,
+            on_page: Optional[Callable[[int, int], None]] = None,
+    ) -> Iterator[str]:
+        """
+        Stream the chunks to index for a PDF or JSON file. PDFs are read page
+        by page; ``on_page(pages_done, total_pages)`` is called as pages are
+        consumed (once with 1/1 for JSON). Unlike ``read_pdf`` this raises on
+        unreadable files instead of returning an empty list.
+        """
+        file_extension = Path(file_path).suffix.lower()
+        if file_extension == '.pdf':
+            with open(file_path, 'rb') as file:
+                total_pages = len(PyPDF2.PdfReader(file).pages)
+
+            def counted_pages():
+                for pages_done, page_text in enumerate(cls.iter_pdf_pages(str(file_path)), start=1):
+                    yield page_text
+                    if on_page:
+                        on_page(pages_done, total_pages)
+
+            yield from cls.iter_chunks(counted_pages())
+        elif file_extension == '.json':
+            yield from cls.read_json(str(file_path))
+            if on_page:
+                on_page(1, 1)
+        else:
+            raise ValueError(f"Nicht unterstütztes Dateiformat: {file_extension}")
+
+    def _insert_in_batches(
+            self,
+            chunks: Iterable[str],
+            source: str,
+            metadata: Optional[Dict[str, Any]],
+            batch_size: Optional[int] = None,
+            on_batch: Optional[Callable[[int], None]] = None,
+    ) -> List[int]:
+        """
+        Embed and insert ``chunks`` in fixed-size batches with a single flush
+        at the end and return the new primary keys in chunk order. If anything
+        fails half-way, the rows inserted so far are removed again so a file is
+        never left partially indexed.
+        """
+        batch_size = batch_size or self.INGEST_BATCH_SIZE
+        metadata_json = json.dumps(metadata or {}, ensure_ascii=False)
+        inserted_ids: List[int] = []
+        count = 0
+
+        def insert(batch: List[str]) -> None:
+            embs = self.model.encode(batch, convert_to_numpy=True).tolist()
+            data = [
+                {
+                    "text": chunk,
+                    "embedding": emb,
+                    "source": source,
+                    "metadata": metadata_json
+                }
+                for chunk, emb in zip(batch, embs)
+            ]
+            inserted_ids.extend(self.store.insert(data))
+
+        try:
+            batch: List[str] = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    insert(batch)
+                    count += len(batch)
+                    batch = []
+                    if on_batch:
+                        on_batch(count)
+            if batch:
+                insert(batch)
+                count += len(batch)
+                if on_batch:
+                    on_batch(count)
+        except Exception:
+            if inserted_ids:
+                self.store.delete_ids(inserted_ids)
+                self.store.flush()
+            raise
+
+        if count:
+            self.store.flush()
+        return inserted_ids
+
+    def add_chunks(
+            self,
+            chunks: Iterable[str],
+            source: str,
+            metadata: Optional[Dict[str, Any]] = None,
+            on_batch: Optional[Callable[[int], None]] = None,
+    ) -> List[int]:
+        """Embed and insert ``chunks`` for ``source``; returns their primary keys."""
+        return self._insert_in_batches(chunks, source, metadata, on_batch=on_batch)
+
+    def add_file(
+            self,
+            file_path: str,
+            progress_callback: Optional[SyncProgressCallback] = None,
+            manifest: Optional[DocManifest] = None,
+    ) -> None:
+        """
+        Index a PDF or JSON file, streamed through ``iter_file_chunks`` and
+        ``add_chunks``. With a ``manifest`` this is ``doc_manifest.sync_file``:
+        only chunks that are not indexed yet are embedded and the manifest is
+        updated. ``progress_callback(pages_done, total_pages, chunks_embedded)``
+        is called after every batch.
+        """
         file_path = Path(file_path)
         if not file_path.exists():
             print(f"Datei nicht gefunden: {file_path}")
             return
-        file_extension = file_path.suffix.lower()
         filename = file_path.name
-        chunks = []
-        if file_extension == '.pdf':
-            chunks = self.read_pdf(str(file_path))
-        elif file_extension == '.json':
-            chunks = self.read_json(str(file_path))
-        else:
-            print(f"Nicht unterstütztes Dateiformat: {file_extension}")
+        try:
+            if manifest is not None:
+                result = sync_file(self, manifest, file_path, progress_callback)
+                count = result.added + result.kept
+            else:
+                pages = [0, 1]
+
+                def on_page(pages_done: int, total_pages: int) -> None:
+                    pages[:] = [pages_done, total_pages]
+
+                def report(chunks_embedded: int) -> None:
+                    if progress_callback:
+                        progress_callback(pages[0], pages[1], chunks_embedded)
+
+                chunks = self.iter_file_chunks(str(file_path), on_page)
+                count = len(self.add_chunks(chunks, filename, {"file_type": file_path.suffix.lower()}, report))
+                report(count)
+        except Exception as e:
+            print(f"Fehler beim Indizieren der Datei {file_path}: {e}")
             return
-        if not chunks:
+        if not count:
             print(f"Keine Inhalte in Datei gefunden: {filename}")
             return
-        self.add_documents_with_metadata(chunks, filename, {"file_type": file_extension})
-        print(f"Datei {filename} erfolgreich hinzugefügt ({len(chunks)} Chunks)")
+        print(f"Datei {filename} erfolgreich hinzugefügt ({count} Chunks)")
 
     def add_documents_with_metadata(self, chunks: List[str], source: str = "", metadata: Dict[str, Any] = None) -> None:
         if not chunks:
             return
-        embs = self.model.encode(chunks, convert_to_numpy=True).tolist()
-        metadata_json = json.dumps(metadata or {}, ensure_ascii=False)
-        data = [
-            {
-                "text": chunk,
-                "embedding": emb,
-                "source": source,
-                "metadata": metadata_json
-            }
-            for chunk, emb in zip(chunks, embs)
-        ]
-
-        self.collection.insert(data)
-        self.collection.flush()
+        self.add_chunks(chunks, source, metadata)
 
     def add_documents(self, chunks: List[str]) -> None:
         self.add_documents_with_metadata(chunks)
 
-    def retrieve(self, query: str, top_k: int = 3) -> List[str]:
-        q_emb = self.model.encode([query], convert_to_numpy=True).tolist()
-        self.collection.load()
-        search_params = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        results = self.collection.search(
-            data=q_emb,
-            anns_field="embedding",
-            param=search_params,
-            limit=top_k,
-            output_fields=["text", "source", "metadata"],
-        )
-        texts = []
-        for hits in results:
-            for hit in hits:
-                texts.append(hit.entity.get("text"))
+    def delete_ids(self, ids: List[int]) -> None:
+        """Remove individual chunks by primary key."""
+        if not ids:
+            return
+        self.store.delete_ids(ids)
+        self.store.flush()
+
+    def encode_query(self, query: str) -> List[float]:
+        return self.encode_queries([query])[0]
+
+    def encode_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed ``queries`` in input order with one model call for all cache misses."""
+        # Chat turns often repeat (or only differ in whitespace), so the
+        # query embedding is served from the LRU cache when possible.
+        embs: List[Optional[List[float]]] = [None] * len(queries)
+        missing: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            cached = self.embedding_cache.get(self.embedding_model_name, query)
+            if cached is not None:
+                embs[i] = cached
+            else:
+                missing.setdefault(normalize_query(query), []).append(i)
+        if missing:
+            texts = [queries[positions[0]] for positions in missing.values()]
+            encoded = self.model.encode(
+                texts, batch_size=self.QUERY_BATCH_SIZE, convert_to_numpy=True
+            ).tolist()
+            for text, positions, emb in zip(texts, missing.values(), encoded):
+                self.embedding_cache.put(self.embedding_model_name, text, emb)
+                for i in positions:
+                    embs[i] = emb
+        return embs
+
+    def _search(
+            self, queries: List[str], top_k: int, timings: Optional[Dict[str, float]]
+    ) -> List[List[Dict[str, Any]]]:
+        """One encode call and one multi-vector search per ``QUERY_BATCH_SIZE`` queries."""
+        self._ensure_loaded()
+        encode_secs = search_secs = 0.0
+        hits: List[List[Dict[str, Any]]] = []
+        for start in range(0, len(queries), self.QUERY_BATCH_SIZE):
+            t0 = time.perf_counter()
+            q_embs = self.encode_queries(queries[start:start + self.QUERY_BATCH_SIZE])
+            t1 = time.perf_counter()
+            hits.extend(self.store.search(q_embs, top_k))
+            encode_secs += t1 - t0
+            search_secs += time.perf_counter() - t1
+        if timings is not None:
+            timings["encode"] = encode_secs
+            timings["search"] = search_secs
+        return hits
+
+    @staticmethod
+    def _with_metadata(hit: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "text": hit["text"],
+            "source": hit["source"],
+            "score": hit["score"],
+            "metadata": json.loads(hit["metadata"] or "{}")
+        }
+
+    def retrieve(
+            self, query: str, top_k: int = 3, timings: Optional[Dict[str, float]] = None
+    ) -> List[str]:
+        """
+        Return the ``top_k`` most similar chunk texts. If ``timings`` is
+        passed it is filled with seconds spent per stage (encode, search,
+        hydrate).
+        """
+        return self.retrieve_batch([query], top_k, timings)[0]
+
+    def retrieve_with_metadata(
+            self, query: str, top_k: int = 3, timings: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        return self.retrieve_batch_with_metadata([query], top_k, timings)[0]
+
+    def retrieve_batch(
+            self, queries: List[str], top_k: int = 3, timings: Optional[Dict[str, float]] = None
+    ) -> List[List[str]]:
+        """
+        ``retrieve`` for many queries at once, e.g. when replaying logged
+        seeker messages. Results are in the order of ``queries``; ``timings``
+        holds the totals over all batches.
+        """
+        hits = self._search(queries, top_k, timings)
+        t0 = time.perf_counter()
+        texts = [[hit["text"] for hit in query_hits] for query_hits in hits]
+        if timings is not None:
+            timings["hydrate"] = time.perf_counter() - t0
         return texts
 
-    def retrieve_with_metadata(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        q_emb = self.model.encode([query], convert_to_numpy=True).tolist()
-        self.collection.load()
-        search_params = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        results = self.collection.search(
-            data=q_emb,
-            anns_field="embedding",
-            param=search_params,
-            limit=top_k,
-            output_fields=["text", "source", "metadata"],
-        )
-        documents = []
-        for hits in results:
-            for hit in hits:
-                doc = {
-                    "text": hit.entity.get("text"),
-                    "source": hit.entity.get("source"),
-                    "score": hit.score,
-                    "metadata": json.loads(hit.entity.get("metadata", "{}"))
-                }
-                documents.append(doc)
-        return documents
+    def retrieve_batch_with_metadata(
+            self, queries: List[str], top_k: int = 3, timings: Optional[Dict[str, float]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        hits = self._search(queries, top_k, timings)
+        t0 = time.perf_counter()
+        results = [[self._with_metadata(hit) for hit in query_hits] for query_hits in hits]
+        if timings is not None:
+            timings["hydrate"] = time.perf_counter() - t0
+        return results
@@ -0,0 +1,80 @@
+# backend/llm/embedding_cache.py
+
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query so that trivially different spellings share a cache
+    entry: NFKC and collapsed whitespace. Case is kept, the embedding model's
+    tokenizer is case-sensitive ("Krebs" and "krebs" embed differently).
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Bounded, thread-safe LRU cache for query embeddings.
+
+    Entries are keyed on (model name, normalized query) and expire after
+    ``ttl`` seconds (``ttl=None`` or ``0`` disables expiry).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_name: str, query: str) -> Tuple[str, str]:
+        return model_name, normalize_query(query)
+
+    def get(self, model_name: str, query: str) -> Optional[Any]:
+        key = self.make_key(model_name, query)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, query: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        key = self.make_key(model_name, query)
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,118 @@
+# backend/llm/language_id.py
+#
+# Language of a user message, decides whether the German RAG context is
+# translated. Cheap signals (umlauts, stopwords) settle most messages; only
+# longer, unclear ones go to langdetect, which is loaded once, restricted to
+# the languages the app sees and seeded so the same text always gets the
+# same answer. The last confident answer per chat session is remembered for
+# follow-ups too short to detect (e.g. "ok", "hmm").
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from langdetect import DetectorFactory, PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
+
+LANGID_SEED = int(os.getenv("LANGID_SEED", "0"))
+LANGID_LANGUAGES = tuple(os.getenv("LANGID_LANGUAGES", "de,en,fr,it").split(","))
+# answer for short messages without any signal and no session history
+LANGID_DEFAULT = os.getenv("LANGID_DEFAULT", "de")
+# messages with fewer letters than this are too short for langdetect
+LANGID_MIN_LETTERS = int(os.getenv("LANGID_MIN_LETTERS", "20"))
+SESSION_CACHE_SIZE = 1024
+
+GERMAN_CHARS = set("äöüß")
+# unambiguous function words only ("was", "also", "will", "die" are both)
+STOPWORDS = {
+    "en": frozenset(
+        "the and is are am i you my me it to of what how can do does have has "
+        "with for this that thanks thank please hello hi yes not feel about "
+        "would should why when where your be been they we our there just".split()
+    ),
+    "de": frozenset(
+        "und ich ist nicht das der den dem des ein eine es mit wie kann habe "
+        "hast sie wir mein meine mir mich auf zu ja nein danke bitte hallo aber "
+        "oder auch noch sehr gut sind bin wird wenn weil dass bei nach von aus "
+        "kein keine schon jetzt heute gibt soll muss".split()
+    ),
+}
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+_sessions: "OrderedDict[str, str]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_detector_factory() -> DetectorFactory:
+    """langdetect profiles for ``LANGID_LANGUAGES``, read once per process."""
+    factory = DetectorFactory()
+    profiles = [
+        (Path(PROFILES_DIRECTORY) / lang).read_text(encoding="utf-8")
+        for lang in LANGID_LANGUAGES
+    ]
+    factory.load_json_profile(profiles)
+    factory.seed = LANGID_SEED
+    return factory
+
+
+def quick_guess(text: str) -> Optional[str]:
+    """'de' / 'en' from umlauts or a clear stopword majority, else None."""
+    lowered = text.casefold()
+    if GERMAN_CHARS & set(lowered):
+        return "de"
+    words = _WORD.findall(lowered)
+    de = sum(word in STOPWORDS["de"] for word in words)
+    en = sum(word in STOPWORDS["en"] for word in words)
+    if de > en and (en == 0 or de >= 2 * en):
+        return "de"
+    if en > de and (de == 0 or en >= 2 * de):
+        return "en"
+    return None
+
+
+def _remember(session_id: Optional[str], lang: str) -> None:
+    if session_id is None:
+        return
+    with _sessions_lock:
+        _sessions[session_id] = lang
+        _sessions.move_to_end(session_id)
+        while len(_sessions) > SESSION_CACHE_SIZE:
+            _sessions.popitem(last=False)
+
+
+def session_language(session_id: str) -> Optional[str]:
+    with _sessions_lock:
+        return _sessions.get(session_id)
+
+
+def detect_language(text: str, session_id: Optional[str] = None) -> str:
+    """
+    ISO 639-1 code of ``text`` (e.g. 'de', 'en'); drop-in for
+    ``langdetect.detect``. Pass the chat id as ``session_id`` so short,
+    unclear follow-ups reuse the chat's last confident answer instead of
+    falling back to ``LANGID_DEFAULT``; longer messages are always detected.
+    """
+    lang = quick_guess(text)
+    if lang is not None:
+        _remember(session_id, lang)
+        return lang
+
+    if sum(ch.isalpha() for ch in text) < LANGID_MIN_LETTERS:
+        # too short for langdetect: stay with the chat's language
+        known = session_language(session_id) if session_id is not None else None
+        return known or LANGID_DEFAULT
+
+    detector = get_detector_factory().create()
+    detector.append(text)
+    try:
+        lang = detector.detect()
+    except LangDetectException:
+        return LANGID_DEFAULT
+    _remember(session_id, lang)
+    return lang
@@ -0,0 +1,137 @@
+# backend/llm/prompt_budget.py
+
+import os
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+import tiktoken
+
+# tokens for system prompt + context + history + current message
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# share of what is left after the system prompt and current message that
+# history may claim before context gets its pick
+HISTORY_SHARE = float(os.getenv("PROMPT_HISTORY_SHARE", "0.4"))
+# a chunk is truncated to fit only if at least this many tokens remain
+MIN_CHUNK_TOKENS = 50
+
+
+@lru_cache(maxsize=1)
+def get_encoding() -> Optional["tiktoken.Encoding"]:
+    # o200k_base is the gpt-4.1 / gpt-4o tokenizer; older tiktoken only ships cl100k_base
+    for name in ("o200k_base", "cl100k_base"):
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception as e:
+            print(f"tiktoken encoding {name} unavailable: {e}")
+    return None
+
+
+def count_tokens(text: str) -> int:
+    enc = get_encoding()
+    if enc is None:
+        # rough fallback when no BPE file can be loaded (e.g. offline)
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    enc = get_encoding()
+    if enc is None:
+        return text[:max_tokens * 4]
+    tokens = enc.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else enc.decode(tokens[:max_tokens])
+
+
+class AssembledPrompt(NamedTuple):
+    prompt: str
+    # system, context, history, user, total, budget, chunks_used,
+    # chunks_dropped, turns_used, turns_dropped
+    tokens: Dict[str, int]
+
+
+def _turn_line(turn: Dict[str, str]) -> str:
+    who = "User" if turn["role"] == "user" else "Assistant"
+    return f"{who}: {turn['content']}\n"
+
+
+def assemble_prompt(
+        system_prompt: str,
+        chunks: List[str],
+        user_input: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        budget: Optional[int] = None,
+) -> AssembledPrompt:
+    """
+    Build the chat prompt so that system prompt, context, history and the
+    current message fit into ``budget`` tokens.
+
+    ``chunks`` are expected best-first (as ``DocumentRetriever.retrieve``
+    returns them), so the lowest-scoring chunks are dropped first; the chunk
+    at the cut-off is truncated if a useful part of it still fits. History
+    is dropped oldest turn first. The system prompt and the current message
+    are always kept.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    history = history or []
+
+    user_part = f"User: {user_input}\nAssistant:"
+    fixed = {
+        "system": count_tokens(system_prompt),
+        "user": count_tokens(user_part) + count_tokens("Context:\n\n\n"),
+    }
+    remaining = max(0, budget - fixed["system"] - fixed["user"])
+
+    # 1) newest turns first, up to the history share
+    turn_lines = [_turn_line(turn) for turn in history]
+    turn_tokens = [count_tokens(line) for line in turn_lines]
+    history_cap = int(remaining * HISTORY_SHARE)
+    kept_turns = 0
+    history_used = 0
+    for tokens in reversed(turn_tokens):
+        if history_used + tokens > history_cap:
+            break
+        history_used += tokens
+        kept_turns += 1
+
+    # 2) best chunks first into everything history left over
+    context_left = remaining - history_used
+    context_lines: List[str] = []
+    context_used = 0
+    for chunk in chunks:
+        line = f"- {chunk}\n"
+        tokens = count_tokens(line)
+        if tokens > context_left:
+            if context_left >= MIN_CHUNK_TOKENS:
+                line = truncate_tokens(line, context_left - 1).rstrip() + "…\n"
+                tokens = count_tokens(line)
+                context_lines.append(line)
+                context_used += tokens
+            break
+        context_lines.append(line)
+        context_used += tokens
+        context_left -= tokens
+
+    # 3) context didn't need its share: give the rest back to older turns
+    spare = remaining - context_used - history_used
+    for tokens in reversed(turn_tokens[:len(turn_tokens) - kept_turns]):
+        if tokens > spare:
+            break
+        spare -= tokens
+        history_used += tokens
+        kept_turns += 1
+
+    kept_history = turn_lines[len(turn_lines) - kept_turns:]
+    prompt = "Context:\n" + "".join(context_lines) + "\n" + "".join(kept_history) + user_part
+
+    tokens = {
+        **fixed,
+        "context": context_used,
+        "history": history_used,
+        "budget": budget,
+        "chunks_used": len(context_lines),
+        "chunks_dropped": len(chunks) - len(context_lines),
+        "turns_used": kept_turns,
+        "turns_dropped": len(history) - kept_turns,
+    }
+    tokens["total"] = fixed["system"] + fixed["user"] + context_used + history_used
+    return AssembledPrompt(prompt, tokens)
@@ -0,0 +1,67 @@
+# backend/llm/registry.py
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover - imported only for type hints
+    from backend.llm.document_retriever_RAG import DocumentRetriever
+
+# Written once the shared retriever is warm; scripts/healthcheck.py reports
+# the container healthy only when it exists.
+READY_FILE = Path(os.getenv(
+    "READY_FILE",
+    Path(__file__).resolve().parent.parent.parent / "data" / ".ready",
+))
+
+_lock = threading.Lock()
+_retriever: Optional['DocumentRetriever'] = None
+_ready = threading.Event()
+
+
+def get_retriever() -> 'DocumentRetriever':
+    """
+    Process-wide DocumentRetriever, so the e5 model is loaded and the
+    collection opened once per Streamlit server instead of once per page.
+    Callers arriving while it is being built wait for that build.
+    """
+    global _retriever
+    if _retriever is None:
+        with _lock:
+            if _retriever is None:
+                from backend.llm.document_retriever_RAG import DocumentRetriever
+                _retriever = DocumentRetriever()
+    return _retriever
+
+
+def warm_up() -> 'DocumentRetriever':
+    """
+    Build the shared retriever and push one query through it, so model
+    weights, the index and the search path are all hot before the first
+    user message. Marks the process ready afterwards.
+    """
+    started = time.perf_counter()
+    retriever = get_retriever()
+    # one encode + search: the first forward pass and first search are the slow ones
+    retriever.retrieve("warm-up", top_k=1)
+    mark_ready()
+    print(f"Retriever warm after {time.perf_counter() - started:.1f}s")
+    return retriever
+
+
+def mark_ready() -> None:
+    _ready.set()
+    READY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    READY_FILE.write_text(f"{os.getpid()}\n")
+
+
+def clear_ready() -> None:
+    """Forget readiness from a previous run (the data dir is a volume)."""
+    _ready.clear()
+    READY_FILE.unlink(missing_ok=True)
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
@@ -1,9 +1,20 @@
 # backend/llm/replicate_client_chatbot.py
 
-from typing import List, Optional, Dict, Tuple, TYPE_CHECKING
-import replicate
-from langdetect import detect
-from backend.database.db import create_tables, get_active_prompt
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Optional, Dict, Iterator, Tuple, TYPE_CHECKING
+from backend.database.db import create_tables, get_active_prompt_version
+from backend.llm.context_translator import ContextTranslator
+from backend.llm.language_id import detect_language
+from backend.llm.prompt_budget import assemble_prompt, count_tokens
+from backend.llm.registry import get_retriever
+from backend.llm.replicate_pool import (
+    areplicate_slot,
+    get_async_replicate_client,
+    get_replicate_client,
+    replicate_slot,
+)
+from backend.utils.metrics import metrics
 
 if TYPE_CHECKING:  # pragma: no cover - imported only for type hints
     from backend.llm.document_retriever_RAG import DocumentRetriever
@@ -19,19 +30,27 @@ class ReplicateClientChatbot:
         "Use only the provided context; do not hallucinate. "
         "If you cannot answer from the context, say so honestly."
     )
+    MAX_COMPLETION_TOKENS = 512
 
     def __init__(
         self,
         api_token: str,
         model: Optional[str] = None,
         retriever: Optional['DocumentRetriever'] = None,
-        timeout: Tuple[float, float] = (5, 300)
+        timeout: Optional[Tuple[float, float]] = None,
+        max_completion_tokens: Optional[int] = None,
     ):
         create_tables()
-        self.client = replicate.Client(api_token=api_token, timeout=timeout)
+        # shared, pooled client; (connect, read) ``timeout`` overrides the
+        # pool's default, concurrency is capped in replicate_pool
+        self.api_token = api_token
+        self.timeout = timeout
+        self.client = get_replicate_client(api_token, timeout)
         self.model = model or self.DEFAULT_MODEL
+        self.max_completion_tokens = max_completion_tokens or self.MAX_COMPLETION_TOKENS
         # defer loading heavy retriever until it's actually needed
         self.retriever = retriever
+        self.translator = ContextTranslator(self.model, api_token, timeout, self.max_completion_tokens)
 
     def generate_response(
         self,
@@ -39,50 +58,242 @@ class ReplicateClientChatbot:
         history: Optional[List[Dict[str, str]]] = None,
         system_prompt: Optional[str] = None,
         top_p: float = 1.0,
-        temperature: float = 1.0
+        temperature: float = 1.0,
+        docs: Optional[List[str]] = None,
+        trace: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
     ) -> str:
-        # 1) Choose system prompt
-        prompt_text = system_prompt or get_active_prompt() or self.DEFAULT_SYSTEM_PROMPT
+        response = "".join(self.stream_response(
+            user_input=user_input,
+            history=history,
+            system_prompt=system_prompt,
+            top_p=top_p,
+            temperature=temperature,
+            docs=docs,
+            trace=trace,
+            session_id=session_id,
+        ))
+        return response.strip()
+
+    def stream_response(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        system_prompt: Optional[str] = None,
+        top_p: float = 1.0,
+        temperature: float = 1.0,
+        docs: Optional[List[str]] = None,
+        trace: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Like ``generate_response`` but yields the reply token by token as it
+        arrives. ``docs`` skips retrieval and uses the given context chunks,
+        e.g. from ``retrieve_batch`` when replaying many seeker messages.
+        If a ``trace`` dict is passed, ``trace["tokens"]`` reports the prompt
+        token budget usage (see ``prompt_budget.assemble_prompt``) and
+        ``trace["prompt_id"]`` the prompt version used. ``session_id`` (the
+        chat id) lets later turns reuse the detected language.
+        """
+        payload = self._build_payload(
+            user_input, history, system_prompt, top_p, temperature, docs, trace, session_id
+        )
+        # time the call only once it holds a slot, not while it waits for one
+        with replicate_slot(), metrics.track("generate", self.model) as call:
+            call.input_tokens = self._payload_tokens(payload)
+            reply = ""
+            try:
+                # client.stream yields server-sent events as they arrive;
+                # client.run(stream=True) would wait for the whole reply
+                for event in self.client.stream(self.model, input=payload):
+                    chunk = str(event)  # "" for anything but output events
+                    if not chunk:
+                        continue
+                    call.first_token()
+                    reply += chunk
+                    yield chunk
+            finally:
+                call.output_tokens = count_tokens(reply)
+
+    async def agenerate_response(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        system_prompt: Optional[str] = None,
+        top_p: float = 1.0,
+        temperature: float = 1.0,
+        trace: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> str:
+        """Async ``generate_response``; see ``astream_response`` for ``trace``."""
+        response = ""
+        async for token in self.astream_response(
+            user_input=user_input,
+            history=history,
+            system_prompt=system_prompt,
+            top_p=top_p,
+            temperature=temperature,
+            trace=trace,
+            session_id=session_id,
+        ):
+            response += token
+        return response.strip()
+
+    async def astream_response(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        system_prompt: Optional[str] = None,
+        top_p: float = 1.0,
+        temperature: float = 1.0,
+        trace: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Async token stream. The prompt lookup, retrieval and language detection
+        don't depend on each other and run concurrently; the LLM call goes
+        through the shared async Replicate client.
+
+        If a ``trace`` dict is passed, ``trace["timings"]`` is filled with
+        per-stage wall-clock seconds (prompt, retrieve, retrieve_encode,
+        retrieve_search, retrieve_hydrate, detect, prepare, translate,
+        slot_wait, first_token, generate, total), plus ``trace["tokens"]`` and
+        ``trace["prompt_id"]`` as in ``stream_response``.
+        """
+        timings: Dict[str, float] = {}
+        if trace is not None:
+            trace["timings"] = timings
+        started = time.perf_counter()
+
+        async def timed(stage: str, func, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await asyncio.to_thread(func, *args, **kwargs)
+            finally:
+                timings[stage] = time.perf_counter() - t0
+
+        async def resolve_prompt() -> str:
+            if system_prompt:
+                return self._resolve_prompt(system_prompt, trace)
+            return await timed("prompt", self._resolve_prompt, None, trace)
 
-        # 2) Retrieve and bullet‐list the RAG context
+        retrieval: Dict[str, float] = {}
+        prompt_text, raw_docs, user_lang = await asyncio.gather(
+            resolve_prompt(),
+            timed("retrieve", self._retrieve, user_input, retrieval),
+            timed("detect", detect_language, user_input, session_id),
+        )
+        timings.update({f"retrieve_{stage}": secs for stage, secs in retrieval.items()})
+        timings["prepare"] = time.perf_counter() - started
+
+        if user_lang.startswith("en"):
+            raw_docs = await timed(
+                "translate", self._translate_context, prompt_text, raw_docs, user_input, history
+            )
+
+        payload = self._assemble_payload(prompt_text, raw_docs, user_input, history, top_p, temperature, trace)
+
+        client = get_async_replicate_client(self.api_token, self.timeout)
+        t0 = time.perf_counter()
+        async with areplicate_slot():
+            timings["slot_wait"] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            with metrics.track("generate", self.model) as call:
+                call.input_tokens = self._payload_tokens(payload)
+                reply = ""
+                try:
+                    async for chunk in await client.async_stream(self.model, input=payload):
+                        if "first_token" not in timings:
+                            timings["first_token"] = time.perf_counter() - t0
+                            call.first_token()
+                        reply += str(chunk)
+                        yield str(chunk)
+                finally:
+                    call.output_tokens = count_tokens(reply)
+        timings["generate"] = time.perf_counter() - t0
+        timings["total"] = time.perf_counter() - started
+
+    def _retrieve(self, user_input: str, timings: Optional[Dict[str, float]] = None) -> List[str]:
+        if self.retriever is None:
+            # the process-wide retriever, usually already warmed up at startup
+            self.retriever = get_retriever()
+        return self.retriever.retrieve(query=user_input, top_k=5, timings=timings)
+
+    def retrieve_batch(self, user_inputs: List[str]) -> List[List[str]]:
+        """RAG context for many messages at once, to pass as ``docs`` in bulk replays."""
         if self.retriever is None:
-            from backend.llm.document_retriever_RAG import DocumentRetriever
-            self.retriever = DocumentRetriever()
-        raw_docs = self.retriever.retrieve(query=user_input, top_k=5)
-        context_str = "\n".join(f"- {chunk}" for chunk in raw_docs)
+            self.retriever = get_retriever()
+        return self.retriever.retrieve_batch(user_inputs, top_k=5)
+
+    def _resolve_prompt(self, system_prompt: Optional[str], trace: Optional[Dict[str, Any]]) -> str:
+        """
+        The system prompt for this turn. ``trace["prompt_id"]`` gets the id of
+        the prompt version actually used (None for an explicit or the default
+        prompt), so the pair can be stored with exactly that version.
+        """
+        prompt_id, prompt_text = (None, system_prompt) if system_prompt else get_active_prompt_version()
+        if trace is not None:
+            trace["prompt_id"] = prompt_id if prompt_text else None
+        return prompt_text or self.DEFAULT_SYSTEM_PROMPT
+
+    @staticmethod
+    def _payload_tokens(payload: Dict[str, Any]) -> int:
+        return count_tokens(payload["system_prompt"]) + count_tokens(payload["prompt"])
+
+    def _build_payload(
+        self,
+        user_input: str,
+        history: Optional[List[Dict[str, str]]],
+        system_prompt: Optional[str],
+        top_p: float,
+        temperature: float,
+        docs: Optional[List[str]] = None,
+        trace: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        # 1) Choose system prompt
+        prompt_text = self._resolve_prompt(system_prompt, trace)
 
-        # 3) Detect the user’s language
-        user_lang = detect(user_input)  # e.g. 'en', 'de'
+        # 2) Retrieve the RAG context (unless it was retrieved in bulk already)
+        raw_docs = docs if docs is not None else self._retrieve(user_input)
 
-        # 4) If the user is English, pre-translate German context into English
+        # 3) Detect the user’s language (remembered per chat session)
+        user_lang = detect_language(user_input, session_id)  # e.g. 'en', 'de'
+
+        # 4) If the user is English, use English versions of the German context;
+        #    translations are cached per chunk, so only unseen chunks cost a call
         if user_lang.startswith("en"):
-            translation_payload = {
-                "prompt": context_str,
-                "system_prompt": (
-                    "You are a translation assistant. "
-                    "Translate these bullet points into clear English, "
-                    "preserving meaning but dropping any German-specific formatting."
-                ),
-                "temperature": 0.0,
-                "top_p": 1.0,
-                "max_completion_tokens": 512,
-            }
-            translated = ""
-            for chunk in replicate.run(
-                self.model,
-                input=translation_payload,
-                stream=True
-            ):
-                translated += chunk
-            context_str = translated.strip()
-
-        # 5) Build the single-prompt string
-        prompt = f"Context:\n{context_str}\n\n"
-        if history:
-            for turn in history:
-                who = "User" if turn["role"] == "user" else "Assistant"
-                prompt += f"{who}: {turn['content']}\n"
-        prompt += f"User: {user_input}\nAssistant:"
+            raw_docs = self._translate_context(prompt_text, raw_docs, user_input, history)
+
+        return self._assemble_payload(prompt_text, raw_docs, user_input, history, top_p, temperature, trace)
+
+    def _translate_context(
+        self,
+        prompt_text: str,
+        docs: List[str],
+        user_input: str,
+        history: Optional[List[Dict[str, str]]],
+    ) -> List[str]:
+        """English versions of the chunks that fit the prompt budget; the rest is never translated."""
+        kept = assemble_prompt(prompt_text, docs, user_input, history).tokens["chunks_used"]
+        return self.translator.translate(docs[:kept], target_lang="en")
+
+    def _assemble_payload(
+        self,
+        prompt_text: str,
+        docs: List[str],
+        user_input: str,
+        history: Optional[List[Dict[str, str]]],
+        top_p: float,
+        temperature: float,
+        trace: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        # 5) Fit system prompt, bullet-listed context and history into the
+        #    token budget (worst chunks and oldest turns go first)
+        assembled = assemble_prompt(prompt_text, docs, user_input, history)
+        prompt = assembled.prompt
+        if trace is not None:
+            trace["tokens"] = assembled.tokens
 
         # 6) Package exactly as the gpt-4.1-mini schema expects
         payload = {
@@ -90,17 +301,6 @@ class ReplicateClientChatbot:
             "system_prompt": prompt_text,
             "temperature": temperature,
             "top_p": top_p,
-            "max_completion_tokens": 512,
+            "max_completion_tokens": self.max_completion_tokens,
         }
-        print(">>> OUTGOING PAYLOAD:", payload)
-
-        # 7) Stream the response
-        response = ""
-        for chunk in replicate.run(
-            self.model,
-            input=payload,
-            stream=True
-        ):
-            response += chunk
-
-        return response.strip()
+        return payload
@@ -0,0 +1,126 @@
+# backend/llm/replicate_pool.py
+#
+# One shared Replicate client per process: keep-alive connection pooling,
+# explicit connect/read timeouts and a cap on concurrent calls. The chatbot,
+# the context translator and the EPITOME evaluator all go through it.
+
+import asyncio
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import httpx
+import replicate
+
+from backend.utils.check_secrets import get_secret
+
+REPLICATE_CONNECT_TIMEOUT = float(os.getenv("REPLICATE_CONNECT_TIMEOUT", "5"))
+# between two bytes of a response, i.e. also between two streamed tokens
+REPLICATE_READ_TIMEOUT = float(os.getenv("REPLICATE_READ_TIMEOUT", "300"))
+REPLICATE_MAX_CONNECTIONS = int(os.getenv("REPLICATE_MAX_CONNECTIONS", "20"))
+REPLICATE_MAX_KEEPALIVE = int(os.getenv("REPLICATE_MAX_KEEPALIVE", "10"))
+REPLICATE_KEEPALIVE_EXPIRY = float(os.getenv("REPLICATE_KEEPALIVE_EXPIRY", "60"))
+# Replicate calls (predictions or streams) in flight at once, process-wide
+REPLICATE_MAX_CONCURRENCY = int(os.getenv("REPLICATE_MAX_CONCURRENCY", "8"))
+
+TIMEOUT = httpx.Timeout(REPLICATE_READ_TIMEOUT, connect=REPLICATE_CONNECT_TIMEOUT)
+LIMITS = httpx.Limits(
+    max_connections=REPLICATE_MAX_CONNECTIONS,
+    max_keepalive_connections=REPLICATE_MAX_KEEPALIVE,
+    keepalive_expiry=REPLICATE_KEEPALIVE_EXPIRY,
+)
+
+# (connect, read) seconds, as accepted by ReplicateClientChatbot(timeout=...)
+TimeoutPair = Tuple[float, float]
+ClientKey = Tuple[str, Optional[TimeoutPair]]
+
+_lock = threading.Lock()
+_clients: Dict[ClientKey, replicate.Client] = {}
+# httpx.AsyncClient pools are bound to the event loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, replicate.Client]]" = (
+    weakref.WeakKeyDictionary()
+)
+_slots = threading.BoundedSemaphore(REPLICATE_MAX_CONCURRENCY)
+
+
+def _client_key(api_token: Optional[str], timeout: Optional[TimeoutPair]) -> ClientKey:
+    return api_token or get_secret("REPLICATE_API_TOKEN"), tuple(timeout) if timeout else None
+
+
+def _timeout(timeout: Optional[TimeoutPair]) -> httpx.Timeout:
+    if timeout is None:
+        return TIMEOUT
+    connect, read = timeout
+    return httpx.Timeout(read, connect=connect)
+
+
+def get_replicate_client(
+        api_token: Optional[str] = None,
+        timeout: Optional[TimeoutPair] = None,
+) -> replicate.Client:
+    """
+    The process-wide client for synchronous calls (``run`` / ``stream``).
+    Its connections are kept alive and reused across calls and threads.
+    There is one client per API token and ``(connect, read)`` timeout
+    override (default: ``REPLICATE_CONNECT_TIMEOUT`` / ``REPLICATE_READ_TIMEOUT``);
+    all of them share the ``REPLICATE_MAX_CONCURRENCY`` call slots.
+    """
+    key = _client_key(api_token, timeout)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                # replicate passes extra kwargs to both of its httpx clients, so
+                # the pool limits go on a sync transport here and an async one
+                # in get_async_replicate_client()
+                client = _clients[key] = replicate.Client(
+                    api_token=key[0],
+                    timeout=_timeout(timeout),
+                    transport=httpx.HTTPTransport(limits=LIMITS),
+                )
+    return client
+
+
+def get_async_replicate_client(
+        api_token: Optional[str] = None,
+        timeout: Optional[TimeoutPair] = None,
+) -> replicate.Client:
+    """Like ``get_replicate_client`` for ``async_run`` / ``async_stream``, one per event loop."""
+    key = _client_key(api_token, timeout)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = replicate.Client(
+                api_token=key[0],
+                timeout=_timeout(timeout),
+                transport=httpx.AsyncHTTPTransport(limits=LIMITS),
+            )
+        return client
+
+
+@contextmanager
+def replicate_slot() -> Iterator[None]:
+    """Hold one of the ``REPLICATE_MAX_CONCURRENCY`` call slots; blocks while all are taken."""
+    _slots.acquire()
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+@asynccontextmanager
+async def areplicate_slot() -> AsyncIterator[None]:
+    """``replicate_slot`` for coroutines: waits without blocking the event loop."""
+    # polling rather than acquiring in a thread, so a cancelled wait can't
+    # leave a slot taken
+    while not _slots.acquire(blocking=False):
+        await asyncio.sleep(0.05)
+    try:
+        yield
+    finally:
+        _slots.release()
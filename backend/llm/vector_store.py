@@ -0,0 +1,448 @@
+# backend/llm/vector_store.py
+
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:  # faiss-cpu is only installed on amd64 images (see Dockerfile)
+    import faiss
+except ImportError:  # pragma: no cover - depends on the platform
+    faiss = None
+
+# Milvus-style index/search parameters; LocalVectorStore understands the same
+# index types (FLAT, IVF_FLAT, HNSW) when FAISS is available.
+DEFAULT_INDEX_PARAMS = {"index_type": "IVF_FLAT", "metric_type": "COSINE", "params": {"nlist": 128}}
+DEFAULT_SEARCH_PARAMS = {"metric_type": "COSINE", "params": {"nprobe": 10}}
+
+# Rows handed to ``VectorStore.insert`` have the keys text, embedding, source
+# and metadata (a JSON string). Search hits additionally carry id and score.
+
+
+class VectorStore(ABC):
+    """Storage and similarity search for chunk embeddings (cosine similarity)."""
+
+    @abstractmethod
+    def insert(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Insert rows and return their primary keys, in order."""
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Make previous inserts/deletes durable and searchable."""
+
+    @abstractmethod
+    def delete_ids(self, ids: List[int]) -> None:
+        ...
+
+    @abstractmethod
+    def delete_by_source(self, source: str) -> None:
+        ...
+
+    @abstractmethod
+    def search(self, vectors: List[List[float]], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Return, per query vector, up to ``top_k`` hits sorted by descending score."""
+
+    @abstractmethod
+    def iter_texts(self, batch_size: int = 500) -> Iterator[str]:
+        """Iterate over the text of every stored chunk."""
+
+    @abstractmethod
+    def load(self) -> None:
+        """Make the store ready for searching."""
+
+    @abstractmethod
+    def drop(self) -> None:
+        """Delete all stored data."""
+
+
+class MilvusVectorStore(VectorStore):
+    MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
+    MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
+
+    def __init__(
+            self,
+            collection_name: str,
+            dim: int,
+            index_params: Optional[Dict[str, Any]] = None,
+            search_params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        from pymilvus import (
+            connections,
+            FieldSchema, CollectionSchema,
+            DataType, Collection, utility
+        )
+        self._utility = utility
+        self.name = collection_name
+        self.index_params = index_params or DEFAULT_INDEX_PARAMS
+        self.search_params = search_params or DEFAULT_SEARCH_PARAMS
+
+        # 1) Connect to Milvus
+        connections.connect(alias="default", host=self.MILVUS_HOST, port=self.MILVUS_PORT)
+
+        # 2) Create collection if needed
+        if not utility.has_collection(collection_name):
+            fields = [
+                FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dim),
+                FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
+                FieldSchema(name="source", dtype=DataType.VARCHAR, max_length=1000),
+                FieldSchema(name="metadata", dtype=DataType.VARCHAR, max_length=10000),
+            ]
+            schema = CollectionSchema(fields, description="Dokumente mit Embeddings")
+            Collection(collection_name, schema)
+
+        self.collection = Collection(collection_name)
+
+        # 3) Create Index, if not already there (or rebuild it when the
+        #    configured index type/params changed)
+        current = next((idx for idx in self.collection.indexes if idx.field_name == "embedding"), None)
+        if current is not None and not self._same_index(current.params):
+            self.collection.release()
+            self.collection.drop_index()
+            current = None
+        if current is None:
+            self.collection.create_index(field_name="embedding", index_params=self.index_params)
+
+    def _same_index(self, existing: Dict[str, Any]) -> bool:
+        params = existing.get("params", {})
+        if isinstance(params, str):
+            params = json.loads(params)
+        return (
+            existing.get("index_type") == self.index_params["index_type"]
+            and {k: str(v) for k, v in params.items()}
+            == {k: str(v) for k, v in self.index_params.get("params", {}).items()}
+        )
+
+    def insert(self, rows: List[Dict[str, Any]]) -> List[int]:
+        return list(self.collection.insert(rows).primary_keys)
+
+    def flush(self) -> None:
+        self.collection.flush()
+
+    def delete_ids(self, ids: List[int]) -> None:
+        if ids:
+            self.collection.delete(f"id in {list(ids)}")
+
+    def delete_by_source(self, source: str) -> None:
+        self.collection.delete(f"source == {json.dumps(source)}")
+
+    def search(self, vectors: List[List[float]], top_k: int) -> List[List[Dict[str, Any]]]:
+        # the collection must already be loaded (see DocumentRetriever._ensure_loaded)
+        results = self.collection.search(
+            data=vectors,
+            anns_field="embedding",
+            param=self.search_params,
+            limit=top_k,
+            output_fields=["text", "source", "metadata"],
+        )
+        return [
+            [
+                {
+                    "id": hit.id,
+                    "text": hit.entity.get("text"),
+                    "source": hit.entity.get("source"),
+                    "metadata": hit.entity.get("metadata") or "{}",
+                    "score": hit.score,
+                }
+                for hit in hits
+            ]
+            for hits in results
+        ]
+
+    def iter_texts(self, batch_size: int = 500) -> Iterator[str]:
+        iterator = self.collection.query_iterator(
+            batch_size=batch_size, expr="id >= 0", output_fields=["text"]
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                for row in rows:
+                    yield row["text"]
+        finally:
+            iterator.close()
+
+    def load(self) -> None:
+        self.collection.load()
+
+    def drop(self) -> None:
+        if self._utility.has_collection(self.name):
+            self._utility.drop_collection(self.name)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for small corpora, no Milvus stack required.
+
+    Normalized float32 embeddings are appended to ``embeddings.f32`` and
+    searched through a read-only memory map, with the row payloads kept in
+    ``records.jsonl`` (one line per embedding row). Search uses a FAISS
+    inner-product index of the configured type when faiss is installed
+    (IVF falls back to flat until the corpus is big enough to train it),
+    otherwise an exact NumPy matrix product. Inserts append to both files
+    and to the in-memory records; the files are only re-read when another
+    process changed them. Deletes rewrite both files, which is fine at the
+    ~10k chunk scale this is meant for.
+    """
+    DATA_DIR = Path(os.getenv(
+        "LOCAL_VECTOR_DIR",
+        Path(__file__).resolve().parent.parent.parent / "data" / "vector_store",
+    ))
+
+    def __init__(
+            self,
+            collection_name: str,
+            dim: int,
+            directory: Optional[Path] = None,
+            index_params: Optional[Dict[str, Any]] = None,
+            search_params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.dim = dim
+        self.index_params = index_params or DEFAULT_INDEX_PARAMS
+        self.search_params = search_params or DEFAULT_SEARCH_PARAMS
+        self.path = Path(directory or self.DATA_DIR) / collection_name
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._emb_path = self.path / "embeddings.f32"
+        self._records_path = self.path / "records.jsonl"
+        self._meta_path = self.path / "meta.json"
+        self._lock = threading.RLock()
+        self._emb_path.touch(exist_ok=True)
+        self._records_path.touch(exist_ok=True)
+
+        meta = {"dim": dim, "next_id": 1}
+        if self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text())
+            if meta["dim"] != dim:
+                raise ValueError(
+                    f"Vector store {self.path} has dim {meta['dim']}, model produces {dim}"
+                )
+        self._next_id = meta["next_id"]
+        self._write_meta()
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._records_stat: Optional[tuple] = None
+        self._index = None
+        self.load()
+
+    # -- persistence -------------------------------------------------------
+    def _write_meta(self) -> None:
+        self._meta_path.write_text(json.dumps({"dim": self.dim, "next_id": self._next_id}))
+
+    def load(self) -> None:
+        with self._lock:
+            self._reload_if_changed()
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self._records_path)
+        except FileNotFoundError:  # dropped by another process
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _reload(self) -> None:
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._emb_path.touch(exist_ok=True)
+            self._records_path.touch(exist_ok=True)
+            with open(self._records_path, encoding="utf-8") as f:
+                text = f.read()
+            # a line without its newline is an insert that was cut short
+            complete = text[:text.rfind("\n") + 1]
+            self._records = [json.loads(line) for line in complete.splitlines() if line.strip()]
+            self._records_stat = self._stat()
+            if self._meta_path.exists():
+                # another process may have inserted since we last looked
+                self._next_id = max(self._next_id, json.loads(self._meta_path.read_text())["next_id"])
+            self._map_embeddings()
+
+    def _reload_if_changed(self) -> None:
+        """Re-read the files if something other than this instance wrote them."""
+        if self._records is None or self._stat() != self._records_stat:
+            self._reload()
+
+    def _map_embeddings(self) -> None:
+        # the shape covers the recorded rows only, so embeddings of an insert
+        # that crashed before writing its records are ignored
+        n = len(self._records)
+        if n:
+            self._emb = np.memmap(self._emb_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        else:
+            self._emb = np.zeros((0, self.dim), dtype=np.float32)
+        self._index = None  # rebuilt lazily on the next search
+
+    def _rewrite(self, keep: List[int]) -> None:
+        embs = np.array(self._emb[keep], dtype=np.float32) if keep else np.zeros((0, self.dim), np.float32)
+        records = [self._records[i] for i in keep]
+        self._emb = None  # release the memory map before replacing the file
+        tmp_emb = self._emb_path.with_suffix(".tmp")
+        tmp_records = self._records_path.with_suffix(".tmp")
+        embs.tofile(tmp_emb)
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_emb, self._emb_path)
+        os.replace(tmp_records, self._records_path)
+        self._reload()
+
+    def _truncate_torn_insert(self) -> None:
+        """Cut off what a crashed insert left behind, so new rows line up again."""
+        rows_bytes = len(self._records) * self.dim * 4
+        if os.path.getsize(self._emb_path) > rows_bytes:
+            self._emb = None  # release the memory map before shrinking the file
+            os.truncate(self._emb_path, rows_bytes)
+        with open(self._records_path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    f.seek(0)
+                    f.truncate(f.read().rfind(b"\n") + 1)
+
+    # -- VectorStore API ---------------------------------------------------
+    def insert(self, rows: List[Dict[str, Any]]) -> List[int]:
+        if not rows:
+            return []
+        embs = np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+        embs /= np.linalg.norm(embs, axis=1, keepdims=True).clip(min=1e-12)
+        with self._lock:
+            self._reload_if_changed()
+            self._truncate_torn_insert()
+            ids = list(range(self._next_id, self._next_id + len(rows)))
+            self._next_id += len(rows)
+            records = [
+                {"id": pk, "text": row["text"], "source": row["source"], "metadata": row["metadata"]}
+                for pk, row in zip(ids, rows)
+            ]
+            # embeddings first, records last: a row only exists once its
+            # record line is complete (see _reload / _map_embeddings)
+            with open(self._emb_path, "ab") as f:
+                f.write(embs.tobytes())
+            with open(self._records_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._write_meta()
+            # extend the in-memory state instead of re-parsing records.jsonl
+            self._records.extend(records)
+            self._records_stat = self._stat()
+            self._map_embeddings()
+        return ids
+
+    def flush(self) -> None:
+        # inserts and deletes are written through immediately
+        pass
+
+    def delete_ids(self, ids: List[int]) -> None:
+        drop = set(ids)
+        with self._lock:
+            # rewrite from the current files, not rows another process has replaced
+            self._reload_if_changed()
+            keep = [i for i, r in enumerate(self._records) if r["id"] not in drop]
+            if len(keep) != len(self._records):
+                self._rewrite(keep)
+
+    def delete_by_source(self, source: str) -> None:
+        with self._lock:
+            self._reload_if_changed()
+            keep = [i for i, r in enumerate(self._records) if r["source"] != source]
+            if len(keep) != len(self._records):
+                self._rewrite(keep)
+
+    def _get_index(self):
+        if self._index is None and faiss is not None and len(self._records):
+            self._index = build_faiss_index(
+                np.ascontiguousarray(self._emb), self.index_params, self.search_params
+            )
+        return self._index
+
+    def search(self, vectors: List[List[float]], top_k: int) -> List[List[Dict[str, Any]]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-12)
+        with self._lock:
+            self._reload_if_changed()
+            n = len(self._records)
+            k = min(top_k, n)
+            if k == 0:
+                return [[] for _ in vectors]
+            index = self._get_index()
+            if index is not None:
+                scores, positions = index.search(queries, k)
+            else:
+                sims = queries @ self._emb.T
+                positions = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(sims, positions, axis=1)
+                order = np.argsort(-scores, axis=1)
+                positions = np.take_along_axis(positions, order, axis=1)
+                scores = np.take_along_axis(scores, order, axis=1)
+            records = self._records
+        return [
+            [
+                {**records[pos], "score": float(score)}
+                for pos, score in zip(row_pos, row_scores)
+                if pos >= 0
+            ]
+            for row_pos, row_scores in zip(positions, scores)
+        ]
+
+    def iter_texts(self, batch_size: int = 500) -> Iterator[str]:
+        with self._lock:
+            self._reload_if_changed()
+            texts = [r["text"] for r in self._records]
+        yield from texts
+
+    def drop(self) -> None:
+        with self._lock:
+            self._emb = None
+            self._index = None
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._records = []
+
+
+def build_faiss_index(embs: "np.ndarray", index_params: Dict[str, Any], search_params: Dict[str, Any]):
+    """Inner-product FAISS index over normalized ``embs`` for Milvus-style params."""
+    dim = embs.shape[1]
+    index_type = index_params.get("index_type", "FLAT")
+    params = index_params.get("params", {})
+    query_params = search_params.get("params", {})
+    nlist = int(params.get("nlist", 128))
+
+    if index_type == "HNSW":
+        index = faiss.IndexHNSWFlat(dim, int(params.get("M", 16)), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = int(params.get("efConstruction", 200))
+        index.hnsw.efSearch = int(query_params.get("ef", 64))
+    elif index_type == "IVF_FLAT" and len(embs) >= nlist * 39:  # ~39 training points per centroid
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(embs)
+        index.nprobe = int(query_params.get("nprobe", 10))
+    else:
+        index = faiss.IndexFlatIP(dim)
+    index.add(embs)
+    return index
+
+
+def faiss_index_type(index) -> str:
+    """Milvus-style name of the index ``build_faiss_index`` actually built."""
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "HNSW"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "IVF_FLAT"
+    return "FLAT"
+
+
+def create_vector_store(
+        backend: str,
+        collection_name: str,
+        dim: int,
+        index_params: Optional[Dict[str, Any]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
+) -> VectorStore:
+    if backend == "milvus":
+        return MilvusVectorStore(collection_name, dim, index_params, search_params)
+    if backend == "local":
+        return LocalVectorStore(collection_name, dim, index_params=index_params, search_params=search_params)
+    raise ValueError(f"Unknown vector store backend: {backend!r} (expected 'milvus' or 'local')")
@@ -0,0 +1,180 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+import httpx
+from replicate.exceptions import ReplicateError
+
+from backend.services.epitome_evaluation import EPITOME_MODEL, call_epitome_model, call_epitome_model_batch
+from backend.utils.metrics import metrics
+
+# HTTP status codes from Replicate that are worth retrying
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# responder messages per LLM call for backfills (see call_epitome_model_batch)
+EPITOME_PACK_SIZE = int(os.getenv("EPITOME_PACK_SIZE", "5"))
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``rate`` tokens are added per second, up to
+    ``capacity``. ``acquire()`` blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_for = (tokens - self._tokens) / self.rate
+            time.sleep(wait_for)
+
+
+class EpitomeBatchResult(NamedTuple):
+    index: int
+    user_input: str
+    llm_response: str
+    evaluation: Optional[dict]
+    error: Optional[Exception]
+    attempts: int
+
+
+def is_transient_error(exc: Exception) -> bool:
+    if isinstance(exc, ReplicateError):
+        return getattr(exc, "status", None) in TRANSIENT_STATUS_CODES
+    return isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def _evaluate_with_retry(
+    call: Callable[[], T],
+    bucket: Optional[TokenBucket],
+    max_retries: int,
+    backoff_base: float,
+) -> Tuple[Optional[T], Optional[Exception], int]:
+    attempt = 0
+    while True:
+        attempt += 1
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return call(), None, attempt
+        except Exception as e:
+            if attempt > max_retries or not is_transient_error(e):
+                return None, e, attempt
+            metrics.inc("replicate_retries_total", model=EPITOME_MODEL, stage="epitome")
+            # exponential backoff with jitter
+            time.sleep(backoff_base * (2 ** (attempt - 1)) * (1 + random.random()))
+
+
+def _packs(pairs: Iterable[Tuple[str, str]], pack_size: int) -> Iterator[List[Tuple[int, str, str]]]:
+    pack = []
+    for index, (user_input, llm_response) in enumerate(pairs):
+        pack.append((index, user_input, llm_response))
+        if len(pack) >= pack_size:
+            yield pack
+            pack = []
+    if pack:
+        yield pack
+
+
+def evaluate_pairs(
+    pairs: Iterable[Tuple[str, str]],
+    max_workers: int = 4,
+    requests_per_second: Optional[float] = 2.0,
+    max_retries: int = 3,
+    backoff_base: float = 1.0,
+    evaluator: Callable[[str, str], dict] = call_epitome_model,
+    pack_size: int = 1,
+    batch_evaluator: Callable[..., List[dict]] = call_epitome_model_batch,
+) -> Iterator[EpitomeBatchResult]:
+    """
+    Evaluate (user_input, llm_response) pairs with bounded concurrency.
+
+    Results are yielded as soon as each evaluation finishes, so they arrive
+    out of order; ``index`` is the position of the pair in ``pairs``.
+    Failures do not stop the batch, they are reported through ``error``.
+    With ``pack_size > 1``, that many pairs share one LLM call through
+    ``batch_evaluator`` (rate limit and retries then apply per pack). It is
+    called with ``return_exceptions=True`` and a ``fallback`` that takes a
+    rate-limit token for every pair it has to evaluate one by one; a pair
+    whose own evaluation fails gets that error on its result only, and is
+    retried on its own if the error is transient.
+    """
+    bucket = TokenBucket(requests_per_second) if requests_per_second else None
+    packs = _packs(pairs, max(1, pack_size))
+    window = max_workers * 2
+
+    def single(user_input: str, llm_response: str) -> Tuple[Optional[dict], Optional[Exception], int]:
+        return _evaluate_with_retry(
+            lambda: evaluator(user_input, llm_response), bucket, max_retries, backoff_base,
+        )
+
+    def throttled(user_input: str, llm_response: str) -> dict:
+        # a batch reply that can't be used turns into one call per pair
+        if bucket is not None:
+            bucket.acquire()
+        return evaluator(user_input, llm_response)
+
+    def run(pack: List[Tuple[int, str, str]]) -> List[Tuple[Optional[dict], Optional[Exception], int]]:
+        if len(pack) == 1:
+            _, user_input, llm_response = pack[0]
+            return [single(user_input, llm_response)]
+        evaluations, error, attempts = _evaluate_with_retry(
+            lambda: batch_evaluator(
+                [(user_input, llm_response) for _, user_input, llm_response in pack],
+                return_exceptions=True,
+                fallback=throttled,
+            ),
+            bucket, max_retries, backoff_base,
+        )
+        if evaluations is None:
+            return [(None, error, attempts)] * len(pack)
+        outcomes = []
+        for (_, user_input, llm_response), evaluation in zip(pack, evaluations):
+            if not isinstance(evaluation, Exception):
+                outcomes.append((evaluation, None, attempts))
+            elif is_transient_error(evaluation):
+                evaluation, error, retries = single(user_input, llm_response)
+                outcomes.append((evaluation, error, attempts + retries))
+            else:
+                outcomes.append((None, evaluation, attempts))
+        return outcomes
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = {}
+        exhausted = False
+        while True:
+            # only pull as many packs as we can keep busy
+            while not exhausted and len(in_flight) < window:
+                try:
+                    pack = next(packs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[pool.submit(run, pack)] = pack
+            if not in_flight:
+                return
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pack = in_flight.pop(future)
+                for (index, user_input, llm_response), (evaluation, error, attempts) in zip(
+                        pack, future.result()):
+                    yield EpitomeBatchResult(index, user_input, llm_response, evaluation, error, attempts)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.database.db import DB_PATH, get_connection
+
+CACHE_PATH = DB_PATH.parent / "epitome_cache.db"
+
+
+class EpitomeCache:
+    """
+    Persistent, content-addressed cache of EPITOME evaluations.
+
+    Entries are keyed by a SHA-256 over the evaluator model, the prompt
+    template version and the responder text, so re-evaluating the same reply
+    with the same prompt never hits the LLM twice.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH) -> None:
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def make_key(model: str, template_version: str, responder_text: str) -> str:
+        payload = "\x1f".join((model, template_version, responder_text))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = get_connection(self.path)
+        if not self._initialized:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS epitome_cache (
+                    key              TEXT PRIMARY KEY,
+                    model            TEXT NOT NULL,
+                    template_version TEXT NOT NULL,
+                    result           TEXT NOT NULL,
+                    created_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    hit_count        INTEGER DEFAULT 0
+                )
+            """)
+            con.commit()
+            self._initialized = True
+        return con
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as con:
+            row = con.execute("SELECT result FROM epitome_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                con.execute("UPDATE epitome_cache SET hit_count = hit_count + 1 WHERE key = ?", (key,))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, template_version: str, result: Dict[str, Any]) -> None:
+        with self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO epitome_cache (key, model, template_version, result) VALUES (?,?,?,?)",
+                (key, model, template_version, json.dumps(result, ensure_ascii=False)),
+            )
+
+    def clear(self) -> None:
+        with self._connect() as con:
+            con.execute("DELETE FROM epitome_cache")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as con:
+            entries, total_hits = con.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM epitome_cache"
+            ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "lifetime_hits": total_hits,
+            }
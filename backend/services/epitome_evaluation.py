@@ -1,14 +1,27 @@
 import json
 import re
-import replicate
 import os
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
 
-# Use secret manager
-from backend.utils.check_secrets import get_secret
+from backend.services.epitome_cache import EpitomeCache
+from backend.llm.prompt_budget import count_tokens
+from backend.llm.replicate_pool import get_replicate_client, replicate_slot
+from backend.utils.metrics import metrics
 
-# Load API token
-REPLICATE_API_TOKEN = get_secret("REPLICATE_API_TOKEN")
-replicate.Client(api_token=REPLICATE_API_TOKEN)
+EPITOME_MODEL = "meta/meta-llama-3-70b-instruct"
+# Bump whenever the evaluation prompt below changes, so cached results of the
+# old prompt are no longer reused.
+PROMPT_TEMPLATE_VERSION = "1"
+# Results of the batched prompt are cached separately from single-prompt ones.
+BATCH_TEMPLATE_VERSION = f"{PROMPT_TEMPLATE_VERSION}-batch"
+# Output tokens per responder in a batched reply (three scores + rationales).
+BATCH_TOKENS_PER_ITEM = 250
+# Stream single evaluations and cancel the prediction once the JSON object is
+# complete; set EPITOME_STREAM=0 to wait for the full reply instead.
+EPITOME_STREAM = os.getenv("EPITOME_STREAM", "1") != "0"
+
+epitome_cache = EpitomeCache()
 
 # def call_epitome_model(user_input, llm_response):
 #     # TEMPORARY MOCK
@@ -18,30 +31,107 @@ replicate.Client(api_token=REPLICATE_API_TOKEN)
 #         "explorations": {"score": 2, "rationale": "You invited further sharing."}
 #     }
 
-def safe_parse_json(raw: str) -> dict:
+def safe_parse_json(raw: str, array: bool = False):
+    """
+    Parse the model's JSON reply, tolerating code fences, chatter around the
+    JSON and missing closing brackets. With ``array=True`` the outermost
+    ``[...]`` is parsed (batched replies) and a list is returned.
+    """
+    opening, closing = ("[", "]") if array else ("{", "}")
     # strip any ```json fences
     cleaned = re.sub(r"^```json\s*|\s*```$", "", raw.strip(), flags=re.IGNORECASE)
-    # pull out the first “{……”
-    if "{" in cleaned:
-        cleaned = cleaned[cleaned.index("{"):]
-    # pull up to the last “}”
-    if "}" in cleaned:
-        cleaned = cleaned[: cleaned.rfind("}") + 1]
+    # pull out the first “{……” (or “[……”)
+    if opening in cleaned:
+        cleaned = cleaned[cleaned.index(opening):]
+    # pull up to the last “}” (or “]”)
+    if closing in cleaned:
+        cleaned = cleaned[: cleaned.rfind(closing) + 1]
     # auto-balance braces
     open_braces  = cleaned.count("{")
     close_braces = cleaned.count("}")
     if open_braces > close_braces:
         cleaned += "}" * (open_braces - close_braces)
+    if array and cleaned.count("[") > cleaned.count("]"):
+        cleaned += "]" * (cleaned.count("[") - cleaned.count("]"))
     try:
-        return json.loads(cleaned)
+        parsed = json.loads(cleaned)
     except json.JSONDecodeError as e:
         raise RuntimeError(f"Still invalid JSON after cleaning: {cleaned!r}") from e
+    if array and not isinstance(parsed, list):
+        raise RuntimeError(f"Expected a JSON array, got: {cleaned!r}")
+    return parsed
+
+
+def is_valid_epitome(result) -> bool:
+    """True if ``result`` has a 0–2 score and a rationale string for every category."""
+    if not isinstance(result, dict):
+        return False
+    for category in ("emotional_reactions", "interpretations", "explorations"):
+        entry = result.get(category)
+        if not isinstance(entry, dict):
+            return False
+        score = entry.get("score")
+        if isinstance(score, bool) or not isinstance(score, int) or not 0 <= score <= 2:
+            return False
+        if not isinstance(entry.get("rationale", ""), str):
+            return False
+    return True
+
+
+class EpitomeValidationError(RuntimeError):
+    """The model's reply is not a valid EPITOME evaluation; ``raw`` is what it sent."""
+
+    def __init__(self, message: str, raw: str) -> None:
+        super().__init__(f"{message}: {raw[:300]!r}")
+        self.raw = raw
+
+
+class JsonObjectScanner:
+    """
+    Incremental scanner for the first top-level JSON object in a token
+    stream. ``feed()`` returns the object's text as soon as its closing
+    brace arrives (braces inside strings don't count), else None.
+    """
 
+    def __init__(self) -> None:
+        self.buffer = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
 
+    def feed(self, text: str) -> Optional[str]:
+        self.buffer += text
+        while self._pos < len(self.buffer):
+            ch = self.buffer[self._pos]
+            self._pos += 1
+            if self._start is None:
+                # skip fences or chatter before the object
+                if ch == "{":
+                    self._start = self._pos - 1
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.buffer[self._start:self._pos]
+        return None
 
-def call_epitome_model(user_input: str, llm_response: str) -> dict:
-    prompt = f"""
-    SYSTEM: You are an EPITOME evaluator. EPITOME is a framework for analyzing empathy in text-based support conversations, rating responses in three ways:
+
+# Shared by the single and the batched prompt.
+EPITOME_INSTRUCTIONS = """SYSTEM: You are an EPITOME evaluator. EPITOME is a framework for analyzing empathy in text-based support conversations, rating responses in three ways:
 
     - **Emotional Reactions**: Does the response express warmth, compassion, or concern?
       - 0: No empathy (purely factual or no caring shown)
@@ -61,7 +151,12 @@ def call_epitome_model(user_input: str, llm_response: str) -> dict:
 
     IMPORTANT:
     - Judge *only* the Responder’s message.
-    - In each “rationale,” paste only the Responder’s words—no paraphrase, no summary, no explanation.
+    - In each “rationale,” paste only the Responder’s words—no paraphrase, no summary, no explanation."""
+
+
+def build_epitome_prompt(llm_response: str) -> str:
+    return f"""
+    {EPITOME_INSTRUCTIONS}
 
     Respond with *only* valid JSON in this exact schema and order (no markdown, no extra text):
 
@@ -76,20 +171,241 @@ def call_epitome_model(user_input: str, llm_response: str) -> dict:
     Now evaluate and emit *only* the JSON object conforming to the schema above. Stop generation immediately after the closing `}}`.
     """
 
-    # 1) stream=False so we get a single return value
-    raw = replicate.run(
-        "meta/meta-llama-3-70b-instruct",
-        input={"prompt": prompt},
-        stream=False,
-        temperature=0.0,
+
+def build_epitome_batch_prompt(llm_responses: List[str]) -> str:
+    numbered = "\n\n    ".join(
+        f"Responder {i}: {response}" for i, response in enumerate(llm_responses, start=1)
     )
+    return f"""
+    {EPITOME_INSTRUCTIONS}
+    - Below are {len(llm_responses)} separate Responder messages. Rate each one on its own.
+
+    Respond with *only* a valid JSON array of exactly {len(llm_responses)} objects, one per Responder and in the same order, each in this exact schema (no markdown, no extra text):
+
+    [
+      {{
+        "id": <Responder number>,
+        "emotional_reactions": {{ "score": <0–2>, "rationale": "<verbatim text excerpt or empty string>" }},
+        "interpretations":    {{ "score": <0–2>, "rationale": "<verbatim text excerpt or empty string>" }},
+        "explorations":       {{ "score": <0–2>, "rationale": "<verbatim text excerpt or empty string>" }}
+      }}
+    ]
+
+    {numbered}
+
+    Now evaluate and emit *only* the JSON array conforming to the schema above. Stop generation immediately after the closing `]`.
+    """
+
+
+def call_epitome_model(user_input: str, llm_response: str, use_cache: bool = True) -> dict:
+    """
+    Evaluate ``llm_response`` with the EPITOME prompt. Results are cached by
+    (model, prompt template version, responder text); pass ``use_cache=False``
+    to force a fresh evaluation (the fresh result still refreshes the cache).
+    """
+    cache_key = epitome_cache.make_key(EPITOME_MODEL, PROMPT_TEMPLATE_VERSION, llm_response)
+    if use_cache:
+        cached = epitome_cache.get(cache_key)
+        metrics.inc("epitome_cache_lookups_total", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
+    prompt = build_epitome_prompt(llm_response)
+    result = stream_epitome_model(prompt) if EPITOME_STREAM else run_epitome_model(prompt)
+    epitome_cache.put(cache_key, EPITOME_MODEL, PROMPT_TEMPLATE_VERSION, result)
+    return result
+
 
-    # 2) If it ever comes back as a list of strings, coalesce it
-    if isinstance(raw, list):
-        raw = "".join(raw)
+def run_epitome_model(prompt: str) -> dict:
+    """Run the single EPITOME prompt to completion and parse the reply."""
+    with replicate_slot(), metrics.track("epitome", EPITOME_MODEL) as call:
+        call.input_tokens = count_tokens(prompt)
+        # 1) stream=False so we get a single return value
+        raw = get_replicate_client().run(
+            EPITOME_MODEL,
+            input={"prompt": prompt, "temperature": 0.0},
+            stream=False,
+        )
+
+        # 2) If it ever comes back as a list of strings, coalesce it
+        if isinstance(raw, list):
+            raw = "".join(raw)
+        call.output_tokens = count_tokens(raw)
 
     # 3) Trim whitespace/newlines
     raw = raw.strip()
 
     # Use our safe parser instead of direct json.loads
-    return safe_parse_json(raw)
\ No newline at end of file
+    result = safe_parse_json(raw)
+    if not is_valid_epitome(result):
+        raise EpitomeValidationError("EPITOME reply does not match the schema", raw)
+    return result
+
+
+def stream_epitome_model(prompt: str) -> dict:
+    """
+    Stream the single EPITOME prompt and cancel the prediction as soon as a
+    complete JSON object has arrived, instead of paying for whatever the
+    model adds after the closing brace. A reply that ends without a
+    complete object is parsed leniently like in ``run_epitome_model``.
+    Raises ``EpitomeValidationError`` if the object doesn't match the schema.
+    """
+    client = get_replicate_client()
+    scanner = JsonObjectScanner()
+    found = None
+    with replicate_slot(), metrics.track("epitome", EPITOME_MODEL) as call:
+        call.input_tokens = count_tokens(prompt)
+        prediction = client.models.predictions.create(
+            model=EPITOME_MODEL,
+            input={"prompt": prompt, "temperature": 0.0},
+            stream=True,
+        )
+        with closing(prediction.stream()) as events:
+            for event in events:
+                if event.event == event.EventType.ERROR:
+                    raise RuntimeError(f"EPITOME prediction {prediction.id} failed: {event.data}")
+                call.first_token()
+                found = scanner.feed(str(event))
+                if found is not None:
+                    break
+        if found is not None and prediction.status not in ("succeeded", "failed", "canceled"):
+            try:
+                prediction.cancel()
+                metrics.inc("epitome_early_stops_total", model=EPITOME_MODEL)
+            except Exception as e:
+                # the result is already complete; the prediction just runs to its end
+                print(f"[EPITOME] could not cancel prediction {prediction.id}: {e}")
+        call.output_tokens = count_tokens(scanner.buffer)
+
+    if found is None:
+        try:
+            result = safe_parse_json(scanner.buffer.strip())
+        except RuntimeError as e:
+            raise EpitomeValidationError(f"EPITOME reply is not JSON ({e})", scanner.buffer) from e
+    else:
+        try:
+            result = json.loads(found)
+        except json.JSONDecodeError as e:
+            raise EpitomeValidationError(f"EPITOME reply is not valid JSON ({e})", found) from e
+    if not is_valid_epitome(result):
+        raise EpitomeValidationError("EPITOME reply does not match the schema", found or scanner.buffer)
+    return result
+
+
+def _normalize_quote(text: str) -> str:
+    return " ".join(text.casefold().split()).strip(" \"'“”‘’.,!?…")
+
+
+def _quotes_other_responder(item: dict, number: int, responses: List[str]) -> bool:
+    """True if a rationale is not from responder ``number`` but from another one."""
+    own = _normalize_quote(responses[number - 1])
+    others = [_normalize_quote(r) for i, r in enumerate(responses, start=1) if i != number]
+    for category in ("emotional_reactions", "interpretations", "explorations"):
+        quote = _normalize_quote(item[category].get("rationale") or "")
+        if quote and quote not in own and any(quote in other for other in others):
+            return True
+    return False
+
+
+def match_batch_items(parsed, responses: List[str]) -> Dict[int, dict]:
+    """
+    Map responder numbers (1-based) to their item in a batched reply. The
+    ids must be exactly 1..n without duplicates, otherwise nothing is
+    accepted; items that are invalid or quote another responder's text are
+    left out as well. Left-out responders are evaluated one by one.
+    """
+    n = len(responses)
+    if not parsed:
+        return {}
+    ids = [item.get("id") if isinstance(item, dict) else None for item in parsed]
+    if len(parsed) != n or sorted(i for i in ids if type(i) is int) != list(range(1, n + 1)):
+        print(f"[EPITOME] batched reply has ids {ids}, expected 1..{n}; evaluating one by one")
+        return {}
+    matched = {}
+    for number, item in zip(ids, parsed):
+        if not is_valid_epitome(item):
+            continue
+        if _quotes_other_responder(item, number, responses):
+            print(f"[EPITOME] batched item {number} quotes another responder; evaluating it alone")
+            continue
+        matched[number] = {key: value for key, value in item.items() if key != "id"}
+    return matched
+
+
+def call_epitome_model_batch(
+        pairs: List[Tuple[str, str]],
+        use_cache: bool = True,
+        return_exceptions: bool = False,
+        fallback: Optional[Callable[[str, str], dict]] = None,
+) -> List[dict]:
+    """
+    Evaluate several (user_input, llm_response) pairs with one LLM call, so
+    the long instruction block is paid once per batch instead of per reply.
+    Results come back in the order of ``pairs``. Cached replies are not sent;
+    entries missing from, invalid in or not attributable in the batched
+    answer (see ``match_batch_items``) are evaluated one by one with
+    ``fallback`` (default: ``call_epitome_model``), which a caller with a
+    rate limit can use to throttle these extra calls too. With
+    ``return_exceptions=True`` a failing one-by-one evaluation puts its
+    exception in that pair's place instead of failing the whole batch.
+    """
+    if fallback is None:
+        def fallback(user_input: str, llm_response: str) -> dict:
+            return call_epitome_model(user_input, llm_response, use_cache=use_cache)
+
+    results: List[dict] = [None] * len(pairs)
+    todo = {}  # llm_response -> positions in pairs
+    for i, (_, llm_response) in enumerate(pairs):
+        if use_cache:
+            cached = epitome_cache.get(
+                epitome_cache.make_key(EPITOME_MODEL, PROMPT_TEMPLATE_VERSION, llm_response)
+            ) or epitome_cache.get(
+                epitome_cache.make_key(EPITOME_MODEL, BATCH_TEMPLATE_VERSION, llm_response)
+            )
+            metrics.inc("epitome_cache_lookups_total", result="miss" if cached is None else "hit")
+            if cached is not None:
+                results[i] = cached
+                continue
+        todo.setdefault(llm_response, []).append(i)
+
+    responses = list(todo)
+    parsed = []
+    if len(responses) > 1:
+        prompt = build_epitome_batch_prompt(responses)
+        with replicate_slot(), metrics.track("epitome", EPITOME_MODEL) as call:
+            call.input_tokens = count_tokens(prompt)
+            raw = get_replicate_client().run(
+                EPITOME_MODEL,
+                input={
+                    "prompt": prompt,
+                    "temperature": 0.0,
+                    "max_tokens": BATCH_TOKENS_PER_ITEM * len(responses) + 100,
+                },
+            )
+            if isinstance(raw, list):
+                raw = "".join(raw)
+            call.output_tokens = count_tokens(raw)
+        try:
+            parsed = safe_parse_json(raw, array=True)
+        except RuntimeError as e:
+            print(f"[EPITOME] batched reply unusable, evaluating one by one: {e}")
+
+    matched = match_batch_items(parsed, responses)
+    for number, llm_response in enumerate(responses, start=1):
+        result = matched.get(number)
+        if result is not None:
+            epitome_cache.put(
+                epitome_cache.make_key(EPITOME_MODEL, BATCH_TEMPLATE_VERSION, llm_response),
+                EPITOME_MODEL, BATCH_TEMPLATE_VERSION, result,
+            )
+        else:
+            position = todo[llm_response][0]
+            try:
+                result = fallback(pairs[position][0], llm_response)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                result = e
+        for position in todo[llm_response]:
+            results[position] = result
+    return results
@@ -0,0 +1,138 @@
+import os
+import random
+import threading
+import time
+import traceback
+from typing import Callable, List, Optional
+
+from backend.database.db import (
+    claim_epitome_jobs,
+    complete_epitome_job,
+    enqueue_epitome_job,
+    fail_epitome_job,
+    recover_epitome_jobs,
+)
+from backend.services.epitome_batch import is_transient_error
+from backend.services.epitome_evaluation import EPITOME_MODEL, call_epitome_model
+from backend.utils.metrics import metrics
+
+EPITOME_WORKERS = int(os.getenv("EPITOME_WORKERS", "2"))
+EPITOME_MAX_ATTEMPTS = int(os.getenv("EPITOME_MAX_ATTEMPTS", "5"))
+
+
+class EpitomeWorkerPool:
+    """
+    Fixed number of worker threads draining the ``epitome_jobs`` table.
+
+    Jobs survive restarts: they only leave the queue once the evaluation is
+    stored. Transient evaluation errors (network, 429, 5xx) and failures to
+    store the result are retried with exponential backoff and moved to the
+    'dead' state after ``max_attempts``; any other evaluation error (e.g.
+    unparseable or invalid model output) is 'dead' right away. Jobs a
+    previous process left 'running' are put back into the queue when the
+    pool starts.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = EPITOME_WORKERS,
+        max_attempts: int = EPITOME_MAX_ATTEMPTS,
+        backoff_base: float = 5.0,
+        poll_interval: float = 2.0,
+        evaluator: Callable[[str, str], dict] = call_epitome_model,
+    ) -> None:
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.poll_interval = poll_interval
+        self.evaluator = evaluator
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            recovered = recover_epitome_jobs()
+            if recovered:
+                print(f"[EPITOME] re-queued {recovered} unfinished job(s)")
+            self._stop.clear()
+            for i in range(self.concurrency):
+                thread = threading.Thread(target=self._run, name=f"epitome-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        """Tell idle workers a new job is there instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                jobs = claim_epitome_jobs(1, time.time())
+            except Exception as e:
+                print(f"[EPITOME] could not claim jobs: {e}")
+                jobs = []
+            if not jobs:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._process(jobs[0])
+
+    def _process(self, job) -> None:
+        try:
+            evaluation = self.evaluator(job["user_input"], job["llm_response"])
+        except Exception as e:
+            # the same input would fail the same way again
+            self._fail(job, e, retry=is_transient_error(e))
+            return
+        try:
+            complete_epitome_job(job["id"], job["chat_id"], job["pair_number"], evaluation)
+        except Exception as e:
+            self._fail(job, e, retry=True)
+
+    def _fail(self, job, exc: Exception, retry: bool) -> None:
+        attempts = job["attempts"] + 1  # claiming counted this attempt
+        error = f"{type(exc).__name__}: {exc}"
+        if not retry or attempts >= self.max_attempts:
+            print(f"[EPITOME] giving up on {job['chat_id']}/{job['pair_number']} "
+                  f"after {attempts} attempt(s): {error}")
+            traceback.print_exception(exc)
+            fail_epitome_job(job["id"], error, None)
+            return
+        # exponential backoff with jitter
+        delay = self.backoff_base * (2 ** (attempts - 1)) * (1 + random.random())
+        metrics.inc("replicate_retries_total", model=EPITOME_MODEL, stage="epitome")
+        print(f"[EPITOME] {job['chat_id']}/{job['pair_number']} failed "
+              f"(attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        fail_epitome_job(job["id"], error, time.time() + delay)
+
+
+_pool: Optional[EpitomeWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> EpitomeWorkerPool:
+    """The process-wide pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EpitomeWorkerPool()
+            _pool.start()
+        return _pool
+
+
+def enqueue_evaluation(chat_id: str, pair_number: int, user_input: str, llm_response: str) -> int:
+    """Persist an evaluation job and nudge the workers; returns the job id."""
+    job_id = enqueue_epitome_job(chat_id, pair_number, user_input, llm_response)
+    get_worker_pool().wake()
+    return job_id
@@ -0,0 +1,204 @@
+# backend/utils/metrics.py
+#
+# In-process metrics for Replicate calls: latency, time-to-first-token,
+# (estimated) token counts, retries and errors, labelled by model and stage
+# (translate, generate, epitome). Exported as Prometheus text on /metrics and
+# as JSON on /metrics.json by start_metrics_server().
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "replicate_request_seconds": ("histogram", "Wall-clock duration of a Replicate call."),
+    "replicate_time_to_first_token_seconds": ("histogram", "Time until the first streamed token arrived."),
+    "replicate_requests_total": ("counter", "Replicate calls by outcome (ok, error, cancelled)."),
+    "replicate_errors_total": ("counter", "Failed Replicate calls by exception type."),
+    "replicate_retries_total": ("counter", "Retried Replicate calls."),
+    "replicate_tokens_total": ("counter", "Prompt (input) and completion (output) tokens, counted with tiktoken."),
+    "epitome_cache_lookups_total": ("counter", "EPITOME cache lookups by result (hit, miss)."),
+    "epitome_early_stops_total": ("counter", "EPITOME predictions cancelled once their JSON was complete."),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value as the Prometheus text format requires."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Dict[str, Any]]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.setdefault(_key(labels), {
+                "buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0,
+            })
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def track(self, stage: str, model: str) -> "RequestTimer":
+        return RequestTimer(self, stage, model)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly copy of every series."""
+        with self._lock:
+            out: Dict[str, Any] = {}
+            for name, series in self._counters.items():
+                out[name] = [{"labels": dict(key), "value": value} for key, value in series.items()]
+            for name, series in self._histograms.items():
+                out[name] = [
+                    {
+                        "labels": dict(key),
+                        "count": hist["count"],
+                        "sum": hist["sum"],
+                        "avg": hist["sum"] / hist["count"] if hist["count"] else 0.0,
+                        "buckets": dict(zip(map(str, LATENCY_BUCKETS), hist["buckets"])),
+                    }
+                    for key, hist in series.items()
+                ]
+            return out
+
+    def render_prometheus(self) -> str:
+        def fmt(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                kind, text = HELP.get(name, ("counter", name))
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for key, value in series.items():
+                    lines.append(f"{name}{fmt(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                kind, text = HELP.get(name, ("histogram", name))
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for key, hist in series.items():
+                    for bound, count in zip(LATENCY_BUCKETS, hist["buckets"]):
+                        lines.append(f"{name}_bucket{fmt(key, ('le', str(bound)))} {count}")
+                    lines.append(f"{name}_bucket{fmt(key, ('le', '+Inf'))} {hist['count']}")
+                    lines.append(f"{name}_sum{fmt(key)} {hist['sum']}")
+                    lines.append(f"{name}_count{fmt(key)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    """
+    Context manager around one Replicate call. Call ``first_token()`` when
+    the first streamed chunk arrives and set ``input_tokens`` /
+    ``output_tokens``; everything is recorded on exit.
+    """
+
+    def __init__(self, registry: Metrics, stage: str, model: str) -> None:
+        self.registry = registry
+        self.labels = {"model": model, "stage": stage}
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.ttft: Optional[float] = None
+        self.started = 0.0
+
+    def __enter__(self) -> "RequestTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def first_token(self) -> None:
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        m = self.registry
+        m.observe("replicate_request_seconds", time.perf_counter() - self.started, **self.labels)
+        if self.ttft is not None:
+            m.observe("replicate_time_to_first_token_seconds", self.ttft, **self.labels)
+        if self.input_tokens:
+            m.inc("replicate_tokens_total", self.input_tokens, kind="input", **self.labels)
+        if self.output_tokens:
+            m.inc("replicate_tokens_total", self.output_tokens, kind="output", **self.labels)
+        if exc_type is None:
+            status = "ok"
+        elif issubclass(exc_type, Exception):
+            status = "error"
+            m.inc("replicate_errors_total", error=exc_type.__name__, **self.labels)
+        else:
+            # GeneratorExit / CancelledError: the consumer stopped reading
+            status = "cancelled"
+        m.inc("replicate_requests_total", status=status, **self.labels)
+
+
+metrics = Metrics()
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/metrics":
+            body = metrics.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body = json.dumps(metrics.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # don't log every scrape
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics and /metrics.json from a daemon thread (once per process)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics server not started on {host}:{port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            print(f"Metrics on http://{host}:{port}/metrics")
+        return _server
@@ -1,18 +1,10 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
-PRELOAD_LOG=/empathic-conversational-agent-lab/data/preload.log
 STREAMLIT_LOG=/empathic-conversational-agent-lab/data/streamlit.log
 
-# 1) Preload in background with error isolation
-echo "Starting preload_documents.py in background…" | tee -a "$PRELOAD_LOG"
-( python scripts/preload_documents.py >> "$PRELOAD_LOG" 2>&1 || echo "⚠️ Preload failed, continuing..." >> "$PRELOAD_LOG" ) &
-
-
-#!/bin/sh
-# echo ">>> Skipping preload for debug"
-# exec streamlit run app.py --server.port=8501 --server.address=0.0.0.0
-
-# 2) Run Streamlit as main process
+# Streamlit runs in-process with the retriever warm-up and the document
+# preload (scripts/serve.py), so pages share one loaded model and index.
+# Warm-up/preload output goes to the same log.
 echo "Launching Streamlit…" | tee -a "$STREAMLIT_LOG"
-exec streamlit run frontend/0_Intro.py --server.address 0.0.0.0 --server.port 8501 >> "$STREAMLIT_LOG" 2>&1
+exec python scripts/serve.py frontend/0_Intro.py --server.address 0.0.0.0 --server.port 8501 >> "$STREAMLIT_LOG" 2>&1
@@ -0,0 +1,73 @@
+# frontend/empathy_table.py
+#
+# Shared by the two empathy-testing pages: keyset-paginated chat pairs with
+# filter widgets, and the "Evaluate Missing EPITOME" run.
+
+import streamlit as st
+
+from backend.database.db import (
+    update_epitome_eval,
+    get_chat_pairs_page,
+    list_prompt_version_names,
+)
+from backend.services.epitome_batch import EPITOME_PACK_SIZE, evaluate_pairs
+
+
+# — data access: only the current page is loaded (keyset pagination)
+def load_missing_pairs():
+    rows, cursor = [], None
+    while True:
+        page, cursor = get_chat_pairs_page(limit=500, after=cursor, missing_eval=True)
+        rows.extend(page)
+        if cursor is None:
+            return rows
+
+def evaluate_missing_pairs():
+    """Evaluate every pair without EPITOME result in packs, with a progress bar."""
+    rows = load_missing_pairs()
+
+    progress = st.progress(0.0, text="Evaluating missing chats...")
+    results = evaluate_pairs(
+        ((row["user_input"], row["llm_response"]) for row in rows),
+        pack_size=EPITOME_PACK_SIZE,
+    )
+    for done, res in enumerate(results, start=1):
+        row = rows[res.index]
+        if res.error is None:
+            update_epitome_eval(row["chat_id"], int(row["pair_number"]), res.evaluation)
+        else:
+            st.error(f"Failed on chat_id {row['chat_id']}: {str(res.error)}")
+        progress.progress(done / len(rows), text=f"Evaluated {done}/{len(rows)} chats")
+
+    st.success("All missing evaluations completed!")
+
+def page_filters(prefix):
+    """Filter widgets; resets the cursor stack whenever a filter changes."""
+    col1, col2, col3, col4 = st.columns(4)
+    version = col1.selectbox("Prompt version", ["All", *list_prompt_version_names()], key=f"{prefix}_version")
+    missing_only = col2.checkbox("Only missing EPITOME", key=f"{prefix}_missing")
+    rating = col3.slider("Feedback rating", 1, 5, (1, 5), key=f"{prefix}_rating")
+    page_size = col4.selectbox("Pairs per page", [25, 50, 100], index=1, key=f"{prefix}_page_size")
+    filters = {
+        "prompt_version": None if version == "All" else version,
+        "missing_eval": missing_only,
+        # the full range means "no rating filter", so unrated pairs stay visible
+        "min_rating": None if rating == (1, 5) else rating[0],
+        "max_rating": None if rating == (1, 5) else rating[1],
+    }
+    state = (tuple(filters.items()), page_size)
+    if st.session_state.get(f"{prefix}_filters") != state:
+        st.session_state[f"{prefix}_filters"] = state
+        st.session_state[f"{prefix}_cursors"] = [None]
+    return filters, page_size
+
+def page_nav(prefix, next_cursor, total):
+    cursors = st.session_state[f"{prefix}_cursors"]
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("◀ Previous", key=f"{prefix}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    info_col.caption(f"Page {len(cursors)} · {total} matching pairs")
+    if next_col.button("Next ▶", key=f"{prefix}_next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
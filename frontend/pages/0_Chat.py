@@ -3,28 +3,13 @@
 import pathlib
 import sys
 import uuid
-import threading
 
 import streamlit as st
 from dotenv import load_dotenv
 
-from backend.services.epitome_evaluation import call_epitome_model
+from backend.services.epitome_queue import enqueue_evaluation
 
 
-
-def _async_evaluate_and_store(chat_id, pair_number, user_input, llm_response):
-    try:
-        eval_json = call_epitome_model(user_input, llm_response)
-        # use the correct kwarg name here:
-        update_epitome_eval(
-            chat_id=chat_id,
-            pair_number=pair_number,
-            epitome_eval_json=eval_json
-        )
-    except Exception as e:
-        # optionally log to console or a file
-        print(f"[EPITOME] failed for {chat_id}/{pair_number}: {e}")
-
 # 1) Set page config must come first
 st.set_page_config(page_title="Empathic Chatbot",
                    page_icon="🦙",
@@ -46,8 +31,6 @@ from backend.database.db import (  # noqa: E402
     insert_chat_pair,
     update_user_feedback,
     get_feedback_statistics,
-    get_active_prompt_id,
-    update_epitome_eval,
 )
 
 # 5) Prepare database
@@ -62,6 +45,8 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_id = str(uuid.uuid4())
     st.session_state.pair_number = 1
     st.session_state.feedback_given = set()  # Set for already rated messages
+if "flash" not in st.session_state:
+    st.session_state.flash = []  # (level, message) to show after the next rerun
 
 # Initialize chatbot lazily and cache across reruns
 @st.cache_resource
@@ -101,6 +86,11 @@ for i, turn in enumerate(st.session_state.chat_history):
                 st.session_state.feedback_given.add(i)
                 st.toast("Thanks for your feedback!")
 
+# Messages from the previous run, which ended in st.rerun()
+for level, message in st.session_state.flash:
+    getattr(st, level)(message)
+st.session_state.flash = []
+
 # New input
 if user_input := st.chat_input("Type your message..."):
     # 1) display user
@@ -108,16 +98,22 @@ if user_input := st.chat_input("Type your message..."):
         st.markdown(user_input)
     st.session_state.chat_history.append({"role": "user", "content": user_input})
 
-    # 2) get bot response
-    with st.chat_message("assistant", avatar="🤖"), st.spinner("Thinking… 🦙"):
-        reply = chatbot.generate_response(
+    # 2) stream bot response token by token
+    with st.chat_message("assistant", avatar="🤖"):
+        trace = {}
+        reply = st.write_stream(chatbot.stream_response(
             user_input=user_input,
-            history=st.session_state.chat_history[-6:]
-        ) or "[No response received]"
-        reply = reply.strip()
-        st.markdown(reply)
-
-        # 3) record & fire‐and‐forget the evaluation
+            # everything before this message; the chatbot trims it to the token budget
+            history=st.session_state.chat_history[:-1],
+            trace=trace,
+            session_id=st.session_state.chat_id,
+        ))
+        reply = (reply if isinstance(reply, str) else "".join(map(str, reply))).strip()
+        if not reply:
+            reply = "[No response received]"
+            st.markdown(reply)
+
+        # 3) record & queue the evaluation
     st.session_state.chat_history.append({"role": "assistant", "content": reply})
     this_pair = st.session_state.pair_number
 
@@ -128,26 +124,29 @@ if user_input := st.chat_input("Type your message..."):
             pair_number=this_pair,
             user_input=user_input,
             llm_response=reply,
-            prompt_id=get_active_prompt_id(),
+            # the prompt version the reply was generated with, not whatever is active now
+            prompt_id=trace.get("prompt_id"),
         )
-
-        # kick off background thread
-        threading.Thread(
-            target=_async_evaluate_and_store,
-            args=(
-                st.session_state.chat_id,
-                this_pair,
-                user_input,
-                reply
-            ),
-            daemon=True
-        ).start()
-
-        # bump counter so next message is stored separately
+    except Exception as e:
+        st.session_state.flash.append(("error", f"❌ Error saving chat pair: {e}"))
+    else:
+        # the pair is stored: bump the counter so the next message gets its own
+        # number, even if queueing the evaluation below fails
         st.session_state.pair_number += 1
 
-    except Exception as e:
-        st.error(f"❌ Error saving or evaluating chat pair: {e}")
+        try:
+            # queue the EPITOME evaluation; the worker pool stores it later
+            enqueue_evaluation(
+                chat_id=st.session_state.chat_id,
+                pair_number=this_pair,
+                user_input=user_input,
+                llm_response=reply,
+            )
+        except Exception as e:
+            print(f"[EPITOME] could not queue {st.session_state.chat_id}/{this_pair}: {e}")
+            st.session_state.flash.append(
+                ("warning", f"⚠️ Chat saved, but the empathy evaluation could not be queued: {e}")
+            )
 
     # 4) rerun so the UI updates
     st.rerun()
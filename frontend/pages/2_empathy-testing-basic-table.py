@@ -4,13 +4,8 @@ try:
 except Exception as e:
     st.error(f"pandas failed to import on this device: {e}")
     st.stop()
-import sqlite3
-
-from backend.database.db import (
-    update_epitome_eval,
-    DB_PATH,
-)
-from backend.services.epitome_evaluation import call_epitome_model
+from backend.database.db import get_chat_pairs_page, count_chat_pairs
+from frontend.empathy_table import evaluate_missing_pairs, page_filters, page_nav
 
 st.set_page_config("🛠️ Empathy Testing Basic Table")
 
@@ -31,42 +26,16 @@ if not st.session_state.get("is_admin", False):
     st.stop()
 
 
-# Check Database is there
-
-def load_chats_from_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    df = pd.read_sql_query("SELECT * FROM chat_pairs", conn)
-    conn.close()
-    return df
-
-# Load database
-df = load_chats_from_db()
-
 # Display title
 st.title("Empathy Testing Basic Table")
 
 # Empathy testing button
 if st.button("Evaluate Missing EPITOME"):
-    missing_df = df[df["epitome_eval"].isnull()]
-
-    with st.spinner("Evaluating missing chats..."):
-        for idx, row in missing_df.iterrows():
-            user_input = row["user_input"]
-            llm_response = row["llm_response"]
-            chat_id = row["chat_id"]
-            pair_number = row["pair_number"]
-
-            try:
-                evaluation = call_epitome_model(user_input, llm_response)
-                update_epitome_eval(chat_id, pair_number, evaluation)
-            except Exception as e:
-                st.error(f"Failed on chat_id {chat_id}: {str(e)}")
-
-    st.success("All missing evaluations completed!")
-
-    # Refresh the table after evaluations
-    df = load_chats_from_db()
-
-st.dataframe(df)
+    evaluate_missing_pairs()
 
+filters, page_size = page_filters("basic")
+rows, next_cursor = get_chat_pairs_page(
+    limit=page_size, after=st.session_state.basic_cursors[-1], **filters
+)
+st.dataframe(pd.DataFrame([dict(row) for row in rows]))
+page_nav("basic", next_cursor, count_chat_pairs(**filters))
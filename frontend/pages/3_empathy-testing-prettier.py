@@ -2,12 +2,8 @@ import json
 
 import streamlit as st
 import pandas as pd
-import sqlite3
-from backend.database.db import (
-    update_epitome_eval,
-    DB_PATH
-)
-from backend.services.epitome_evaluation import call_epitome_model
+from backend.database.db import get_chat_pairs_page, count_chat_pairs
+from frontend.empathy_table import evaluate_missing_pairs, page_filters, page_nav
 
 st.set_page_config("🛠️ Empathy Testing Prettier")
 
@@ -28,55 +24,32 @@ if not st.session_state.get("is_admin", False):
     st.stop()
 
 
-# Check Database is there
-
-def load_chats_from_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    df = pd.read_sql_query("SELECT * FROM chat_pairs", conn)
-    conn.close()
-    return df
-
-# Load database
-df = load_chats_from_db()
-
 # Display title
 st.title("Empathy Testing Prettier")
 
 # Empathy testing button
 if st.button("Evaluate Missing EPITOME"):
-    missing_df = df[df["epitome_eval"].isnull()]
-
-    with st.spinner("Evaluating missing chats..."):
-        for idx, row in missing_df.iterrows():
-            user_input = row["user_input"]
-            llm_response = row["llm_response"]
-            chat_id = row["chat_id"]
-            pair_number = row["pair_number"]
-
-            try:
-                evaluation = call_epitome_model(user_input, llm_response)
-                update_epitome_eval(chat_id, pair_number, evaluation)
-            except Exception as e:
-                st.error(f"Failed on chat_id {chat_id}: {str(e)}")
-
-    st.success("All missing evaluations completed!")
-
-    # Refresh the table after evaluations
-    df = load_chats_from_db()
+    evaluate_missing_pairs()
 
 st.header("Chat Evaluations")
 
-# Group by chat_id first
-grouped = df.groupby('chat_id')
+filters, page_size = page_filters("prettier")
+rows, next_cursor = get_chat_pairs_page(
+    limit=page_size, after=st.session_state.prettier_cursors[-1], **filters
+)
+if not rows:
+    st.info("No chat pairs match these filters.")
+
+# Group the pairs of this page by chat_id (newest chat first)
+grouped = {}
+for row in rows:
+    grouped.setdefault(row["chat_id"], []).append(row)
 
-for chat_id, group in grouped:
+for chat_id, group in grouped.items():
     with st.container(border=True):
         st.markdown(f"## Chat ID: `{chat_id}`")
 
-        group = group.sort_values("pair_number")
-
-        for idx, row in group.iterrows():
+        for row in sorted(group, key=lambda r: r["pair_number"]):
             st.markdown(f"### ➡️ Pair {row['pair_number']}")
 
             st.markdown("**🧑 Seeker's Message:**")
@@ -116,3 +89,5 @@ for chat_id, group in grouped:
                 st.markdown("**📝 User Feedback:**")
                 st.info(f"{row['user_feedback']}")
             st.markdown("---")
+
+page_nav("prettier", next_cursor, count_chat_pairs(**filters))
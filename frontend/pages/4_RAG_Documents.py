@@ -1,8 +1,9 @@
 import streamlit as st
 import pathlib
 import json
-from pymilvus import utility, connections
-from backend.llm.document_retriever_RAG import DocumentRetriever
+import hashlib
+from backend.llm.doc_manifest import DocManifest, remove_file, sync_file
+from backend.llm.registry import get_retriever
 
 st.set_page_config(page_title="RAG Documents", page_icon="📚")
 
@@ -29,49 +30,55 @@ MANIFEST_PATH = DATA_DIR / "doc_manifest.json"
 
 # — manifest helpers
 def load_manifest():
-    if MANIFEST_PATH.exists():
-        try:
-            return set(json.loads(MANIFEST_PATH.read_text()))
-        except json.JSONDecodeError:
-            st.error("Fehler: Manifest-Datei konnte nicht geparst werden.")
-    return set()
-
-def save_manifest(filenames):
-    DATA_DIR.mkdir(exist_ok=True)
-    MANIFEST_PATH.write_text(json.dumps(sorted(list(filenames)), ensure_ascii=False, indent=2))
+    try:
+        return DocManifest.load(MANIFEST_PATH)
+    except (json.JSONDecodeError, AttributeError):
+        st.error("Fehler: Manifest-Datei konnte nicht geparst werden.")
+    return DocManifest(MANIFEST_PATH)
+
+def sync_with_progress(retriever, manifest, path: pathlib.Path):
+    bar = st.progress(0.0, text=f"Prüfe {path.name} …")
+
+    def on_progress(pages_done, total_pages, chunks_done):
+        bar.progress(
+            min(pages_done / total_pages, 1.0) if total_pages else 1.0,
+            text=f"Indexiere {path.name} … Seite {pages_done}/{total_pages}, {chunks_done} neue Chunks",
+        )
+
+    try:
+        return sync_file(retriever, manifest, path, progress_callback=on_progress)
+    finally:
+        bar.empty()
 
 # — init
-retriever = DocumentRetriever()
-existing = load_manifest()
+retriever = get_retriever()
+manifest = load_manifest()
 
 if not MANIFEST_PATH.exists():
-    save_manifest(existing)
+    manifest.save()
 
 st.title("📚 RAG – Indexed Documents")
 
 # — REINDEX BUTTON —
 st.subheader("🔄 Reindex All Documents")
 if st.button("Reindex all"):
-    # 1) drop the Milvus collection
-    connections.connect(alias="default",
-                        host=DocumentRetriever.MILVUS_HOST,
-                        port=DocumentRetriever.MILVUS_PORT)
-    if utility.has_collection(DocumentRetriever.COLLECTION_NAME):
-        utility.drop_collection(DocumentRetriever.COLLECTION_NAME)
-
-    # 2) recreate retriever (it will recreate the collection)
-    retriever = DocumentRetriever()
-
-    # 3) re-add every file from your manifest
-    DOCS_DIR = pathlib.Path("docs")
-    for fname in sorted(existing):
+    # every file in the manifest: only chunks whose content hash changed are
+    # re-embedded; vectors of removed chunks and of files missing on disk are
+    # deleted. New files in docs/ are added through the upload below.
+    for fname in manifest.names():
         path = DOCS_DIR / fname
-        if path.exists():
-            with st.spinner(f"Indexiere {fname} neu…"):
-                retriever.add_file(str(path))
-        else:
-            st.warning(f"Datei nicht gefunden: {fname}")
-    st.success("✅ Alle Dokumente wurden neu indiziert.")
+        if not path.exists():
+            remove_file(retriever, manifest, fname)
+            st.warning(f"Datei nicht gefunden, Vektoren entfernt: {fname}")
+            continue
+        try:
+            result = sync_with_progress(retriever, manifest, path)
+        except Exception as e:
+            st.error(f"❌ Fehler beim Indizieren von {fname}: {e}")
+            continue
+        if not result.unchanged:
+            st.write(f"🔁 {fname}: +{result.added} / −{result.removed} Chunks ({result.kept} unverändert)")
+    st.success("✅ Alle Dokumente sind auf dem aktuellen Stand.")
     st.rerun()
 
 
@@ -100,7 +107,7 @@ any_added = False
 if uploaded:
     for up in uploaded:
         st.write(f"📥 Processing upload: {up.name}")
-        if up.name in existing:
+        if manifest.files.get(up.name, {}).get("sha256") == hashlib.sha256(up.getbuffer()).hexdigest():
             st.warning(f"⏭️ {up.name} ist bereits indiziert.")
             continue
 
@@ -115,13 +122,10 @@ if uploaded:
             st.error(f"❌ Fehler beim Speichern von {up.name}: {e}")
             continue
 
-        # 2) Index into Milvus
+        # 2) Index new or changed chunks into the vector store
         try:
-            with st.spinner(f"Indexiere {up.name} …"):
-                retriever.add_file(str(DOCS_DIR / up.name))
-            st.success(f"✅ {up.name} erfolgreich indiziert.")
-            existing.add(up.name)
-            save_manifest(existing)
+            result = sync_with_progress(retriever, manifest, DOCS_DIR / up.name)
+            st.success(f"✅ {up.name} erfolgreich indiziert (+{result.added} / −{result.removed} Chunks).")
             any_added = True
         except Exception as e:
             st.error(f"❌ Fehler beim Indizieren von {up.name}: {e}")
@@ -137,10 +141,10 @@ if uploaded:
 
 # — SHOW & DELETE
 st.subheader("🗂️ Indizierte Dokumente")
-if not existing:
+if not manifest.files:
     st.info("Noch keine Dokumente indiziert.")
 else:
-    for fname in sorted(existing):
+    for fname in manifest.names():
         col1, col2 = st.columns([0.8, 0.2])
         col1.write(f"**{fname}**")
         if col2.button("🗑️ Delete", key=f"del_{fname}"):
@@ -149,14 +153,8 @@ else:
             if fp.exists():
                 fp.unlink()
 
-            # 2) delete vectors from Milvus
-            expr = f"source == '{fname}'"
-            retriever.collection.delete(expr)
-            retriever.collection.flush()
-
-            # 3) update manifest
-            existing.remove(fname)
-            save_manifest(existing)
+            # 2) delete vectors from the vector store and the manifest entry
+            remove_file(retriever, manifest, fname)
 
             st.success(f"🗑️ {fname} gelöscht.")
             st.rerun()
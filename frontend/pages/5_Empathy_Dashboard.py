@@ -1,10 +1,7 @@
 import streamlit as st
-import json
-import re
 import pandas as pd
-import sqlite3
 
-from backend.database.db import DB_PATH
+from backend.database.db import create_tables, get_epitome_job_counts, get_prompt_stats
 
 st.set_page_config(page_title="Prompt-Level Empathy Dashboard")
 
@@ -25,77 +22,25 @@ if not st.session_state.get("is_admin", False):
     st.stop()
 
 
-def load_chats_from_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    df = pd.read_sql_query("""
-        SELECT
-          cp.*,
-          pv.version_name,
-          pv.prompt_text AS system_prompt
-        FROM chat_pairs cp
-        LEFT JOIN prompt_versions pv
-          ON cp.prompt_id = pv.id
-        """, conn)
-    conn.close()
-    return df
-
-
-def parse_epitome(json_str):
-    if pd.isna(json_str):
-        return pd.Series([None, None, None])
-    try:
-        j = json.loads(json_str)
-        return pd.Series([
-            j["emotional_reactions"]["score"],
-            j["interpretations"]["score"],
-            j["explorations"]["score"],
-        ])
-    except Exception:
-        return pd.Series([None, None, None])
-
-
-def parse_feedback(fb_text):
-    if not isinstance(fb_text, str):
-        return None
-    m = re.search(r"Rating:\s*([1-5])\/5", fb_text)
-    return int(m.group(1)) if m else None
-
-
-# ——— Load & enrich data ———
-df = load_chats_from_db()
-
-# EPITOME scores
-df[["emotional_reactions", "interpretations", "explorations"]] = (
-    df["epitome_eval"].apply(parse_epitome)
-)
-df["epitome_total_score"] = (
-    df["emotional_reactions"]
-  + df["interpretations"]
-  + df["explorations"]
-)
-
-# User feedback score
-df["feedback_score"] = (
-  pd.to_numeric(df["user_feedback"], errors="coerce")
-    .astype("Int64")  # nullable integer dtype
-)
-
-
-
-# ——— Prompt-Level Summary ———
-agg = (
-    df
-      .groupby("version_name")
-      .agg(
-         Prompt_Name   = ("version_name",    "first"),
-         Chats         = ("chat_id",         "count"),
-         Avg_ER        = ("emotional_reactions", "mean"),
-         Avg_IP        = ("interpretations",     "mean"),
-         Avg_EX        = ("explorations",        "mean"),
-         Avg_Feedback  = ("feedback_score",      "mean"),
-      )
-      .reset_index(drop=True)
+# ——— Load pre-aggregated per-prompt stats ———
+# prompt_stats is kept current by triggers on chat_pairs, so this is a single
+# small query no matter how much chat history exists.
+create_tables()
+agg = pd.DataFrame(
+    [dict(row) for row in get_prompt_stats()],
+    columns=["version_name", "prompt_text", "latest_prompt_id", "pairs",
+             "avg_er", "avg_ip", "avg_ex", "avg_feedback"],
+).rename(columns={
+    "version_name": "Prompt_Name",
+    "pairs":        "Chats",
+    "avg_er":       "Avg_ER",
+    "avg_ip":       "Avg_IP",
+    "avg_ex":       "Avg_EX",
+    "avg_feedback": "Avg_Feedback",
+})
+prompt_texts = dict(zip(agg["Prompt_Name"], agg["prompt_text"]))
+agg[["Avg_ER", "Avg_IP", "Avg_EX", "Avg_Feedback"]] = (
+    agg[["Avg_ER", "Avg_IP", "Avg_EX", "Avg_Feedback"]].astype(float)
 )
 
 # 1) Compute overall EPITOME avg and delta
@@ -134,9 +79,16 @@ st.dataframe(
        })
 )
 
+# 4) EPITOME queue: evaluations not in the averages above yet
+st.header("EPITOME Queue")
+jobs = get_epitome_job_counts()
+pending_col, running_col, dead_col = st.columns(3)
+pending_col.metric("Pending", jobs.get("pending", 0))
+running_col.metric("Running", jobs.get("running", 0))
+dead_col.metric("Failed", jobs.get("dead", 0))
+
 # 5) Full Prompt Text Reference
 st.header("Full Prompt Texts")
 for prompt_name in agg["Prompt_Name"]:
     with st.expander(prompt_name):
-        text = df.loc[df.version_name == prompt_name, "system_prompt"].unique()
-        st.code(text[0] if len(text) else "—")
+        st.code(prompt_texts.get(prompt_name) or "—")
@@ -0,0 +1,110 @@
+# scripts/benchmark_language_id.py
+# Compare the old per-turn langdetect.detect() with backend.llm.language_id:
+# first-call (load) time, per-message latency, accuracy on labelled chat
+# messages and how often repeated runs on the same text disagree.
+# A wrong 'en' triggers a translation call, so those are counted separately.
+#
+#   python scripts/benchmark_language_id.py
+#   python scripts/benchmark_language_id.py --messages labelled.tsv --repeat 20
+
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import langdetect  # noqa: E402
+
+from backend.llm import language_id  # noqa: E402
+
+# (expected language, message)
+DEFAULT_MESSAGES = [
+    ("de", "ok danke"),
+    ("de", "danke"),
+    ("de", "ja"),
+    ("de", "Hallo"),
+    ("de", "Ich habe Angst vor der Chemotherapie."),
+    ("de", "Was kann ich gegen Müdigkeit während der Therapie tun?"),
+    ("de", "Wer bezahlt die Fahrtkosten zur Behandlung?"),
+    ("de", "Meine Schwester hat Brustkrebs, wie kann ich ihr helfen?"),
+    ("de", "Brustkrebs Nachsorge Ernaehrung"),
+    ("de", "Das ist alles sehr viel auf einmal."),
+    ("en", "ok thanks"),
+    ("en", "hi"),
+    ("en", "What are side effects of chemotherapy?"),
+    ("en", "I feel overwhelmed, what should I do?"),
+    ("en", "How do I tell my family and friends I have breast cancer?"),
+    ("en", "Can I continue working during treatment?"),
+    ("en", "Is joining a clinical trial safe?"),
+    ("en", "chemotherapy hair loss"),
+    ("en", "That helps, thank you."),
+    ("fr", "Quels sont les effets secondaires de la chimiothérapie ?"),
+]
+
+
+def old_detect(text: str) -> str:
+    try:
+        return langdetect.detect(text)
+    except langdetect.LangDetectException:
+        return "unknown"
+
+
+def measure(name, detect, messages, repeat):
+    t0 = time.perf_counter()
+    detect(messages[0][1])
+    first_ms = (time.perf_counter() - t0) * 1000
+
+    latencies, correct, false_en, unstable = [], 0, 0, 0
+    for expected, text in messages:
+        answers = set()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            answer = detect(text)
+            latencies.append(time.perf_counter() - t0)
+            answers.add(answer)
+        unstable += len(answers) > 1
+        # score the most recent answer, as a chat turn would see it
+        correct += answer == expected
+        false_en += answer == "en" and expected != "en"
+
+    lat_us = sorted(latency * 1e6 for latency in latencies)
+    print(f"{name:<22} {first_ms:>9.1f} {lat_us[len(lat_us) // 2]:>9.1f} "
+          f"{lat_us[min(len(lat_us) - 1, int(len(lat_us) * 0.95))]:>9.1f} "
+          f"{correct / len(messages):>9.2%} {false_en:>9} {unstable:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark language identification.")
+    parser.add_argument("--messages", type=pathlib.Path,
+                        help="TSV file: expected language <tab> message, one per line")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per message")
+    args = parser.parse_args()
+
+    messages = DEFAULT_MESSAGES
+    if args.messages:
+        messages = [
+            tuple(line.split("\t", 1))
+            for line in args.messages.read_text(encoding="utf-8").splitlines() if "\t" in line
+        ]
+    t0 = time.perf_counter()
+    language_id.get_detector_factory()
+    print(f"language_id profiles ({','.join(language_id.LANGID_LANGUAGES)}) loaded in "
+          f"{(time.perf_counter() - t0) * 1000:.1f} ms at startup")
+    print(f"{len(messages)} messages, {args.repeat} runs each\n")
+    print(f"{'path':<22} {'first ms':>9} {'p50 µs':>9} {'p95 µs':>9} "
+          f"{'accuracy':>9} {'false en':>9} {'unstable':>9}")
+
+    measure("langdetect.detect", old_detect, messages, args.repeat)
+    measure("detect_language", language_id.detect_language, messages, args.repeat)
+
+    # a chat: the first message settles the language, follow-ups reuse it
+    def in_session(text: str) -> str:
+        return language_id.detect_language(text, session_id="benchmark")
+    language_id.detect_language("Ich habe Angst vor der Chemotherapie.", session_id="benchmark")
+    german = [(lang, text) for lang, text in messages if lang == "de"]
+    measure("detect_language+chat", in_session, german, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
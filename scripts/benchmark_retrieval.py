@@ -0,0 +1,195 @@
+# scripts/benchmark_retrieval.py
+# Compare vector index configurations on the chunks from docs/: every config
+# is built over the same embeddings and scored against exact (brute-force)
+# cosine search for recall@k, p50/p95 query latency and index memory.
+#
+#   python scripts/benchmark_retrieval.py                    # Milvus scratch collections
+#   python scripts/benchmark_retrieval.py --backend local    # in-process FAISS
+#   python scripts/benchmark_retrieval.py --queries queries.txt --k 5 --out bench.json
+
+import argparse
+import json
+import pathlib
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from sentence_transformers import SentenceTransformer  # noqa: E402
+
+from backend.llm.document_retriever_RAG import DocumentRetriever  # noqa: E402
+
+DOCS_DIR = pathlib.Path(__file__).parent.parent / "docs"
+
+DEFAULT_QUERIES = [
+    "What are side effects of chemotherapy?",
+    "I feel overwhelmed, what should I do?",
+    "How do I tell my family and friends I have breast cancer?",
+    "Can I continue working during treatment?",
+    "Is joining a clinical trial safe?",
+    "Was kann ich gegen Müdigkeit während der Therapie tun?",
+    "Wer bezahlt die Fahrtkosten zur Behandlung?",
+    "Welche Ernährung ist bei Krebs empfehlenswert?",
+    "Was passiert nach einem Verdacht auf Krebs?",
+    "Helfen komplementärmedizinische Methoden bei Brustkrebs?",
+]
+
+COSINE = "COSINE"
+# (index_params, [search_params, ...]) — every search setting is measured on
+# the same built index.
+CONFIGS = [
+    ({"index_type": "FLAT", "metric_type": COSINE, "params": {}},
+     [{"metric_type": COSINE, "params": {}}]),
+    *[
+        ({"index_type": "IVF_FLAT", "metric_type": COSINE, "params": {"nlist": nlist}},
+         [{"metric_type": COSINE, "params": {"nprobe": nprobe}} for nprobe in (4, 10, 32)])
+        for nlist in (64, 128, 256)
+    ],
+    *[
+        ({"index_type": "HNSW", "metric_type": COSINE, "params": {"M": m, "efConstruction": 200}},
+         [{"metric_type": COSINE, "params": {"ef": ef}} for ef in (32, 64, 128)])
+        for m in (8, 16, 32)
+    ],
+]
+
+
+def load_chunks():
+    chunks = []
+    for path in sorted(DOCS_DIR.glob("*")):
+        if path.suffix.lower() == ".pdf":
+            chunks.extend(DocumentRetriever.read_pdf(str(path)))
+        elif path.suffix.lower() == ".json":
+            chunks.extend(DocumentRetriever.read_json(str(path)))
+    return chunks
+
+
+def estimate_memory_mb(index_params, n, dim):
+    """Rough index footprint (vectors + structure) as Milvus/FAISS lay it out."""
+    vectors = n * dim * 4
+    params = index_params.get("params", {})
+    if index_params["index_type"] == "IVF_FLAT":
+        extra = params["nlist"] * dim * 4 + n * 8
+    elif index_params["index_type"] == "HNSW":
+        extra = n * params["M"] * 2 * 4
+    else:
+        extra = 0
+    return (vectors + extra) / 2 ** 20
+
+
+def label(index_params, search_params, built):
+    params = {**index_params.get("params", {}), **search_params.get("params", {})}
+    text = index_params["index_type"] + "".join(f" {k}={v}" for k, v in params.items())
+    # the local IVF index falls back to FLAT on corpora too small to train it
+    return text if built == index_params["index_type"] else f"{text} -> {built}"
+
+
+def run_milvus(embs, queries, k):
+    from pymilvus import utility
+    from backend.llm.vector_store import MilvusVectorStore
+
+    for i, (index_params, search_settings) in enumerate(CONFIGS):
+        store = MilvusVectorStore(f"bench_retrieval_{i}", embs.shape[1], index_params)
+        try:
+            ids = []
+            for start in range(0, len(embs), 1000):
+                ids.extend(store.insert([
+                    {"text": "", "embedding": emb.tolist(), "source": "benchmark", "metadata": "{}"}
+                    for emb in embs[start:start + 1000]
+                ]))
+            store.flush()
+            utility.wait_for_index_building_complete(store.name)
+            store.load()
+            position = {pk: pos for pos, pk in enumerate(ids)}
+            for search_params in search_settings:
+                store.search_params = search_params
+                results, latencies = [], []
+                for q in queries:
+                    t0 = time.perf_counter()
+                    hits = store.search([q.tolist()], k)[0]
+                    latencies.append(time.perf_counter() - t0)
+                    results.append([position[hit["id"]] for hit in hits])
+                # Milvus always builds the requested index type
+                yield index_params, search_params, index_params["index_type"], results, latencies, (
+                    estimate_memory_mb(index_params, len(embs), embs.shape[1])
+                )
+        finally:
+            store.drop()
+
+
+def run_local(embs, queries, k):
+    import faiss
+    from backend.llm.vector_store import build_faiss_index, faiss_index_type
+
+    for index_params, search_settings in CONFIGS:
+        for search_params in search_settings:
+            index = build_faiss_index(embs, index_params, search_params)
+            memory_mb = faiss.serialize_index(index).nbytes / 2 ** 20
+            results, latencies = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                _, positions = index.search(q[None, :], k)
+                latencies.append(time.perf_counter() - t0)
+                results.append([int(p) for p in positions[0] if p >= 0])
+            yield index_params, search_params, faiss_index_type(index), results, latencies, memory_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector index configurations.")
+    parser.add_argument("--backend", choices=("milvus", "local"), default="milvus")
+    parser.add_argument("--queries", type=pathlib.Path, help="text file, one query per line")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--out", type=pathlib.Path, help="write all results as JSON")
+    args = parser.parse_args()
+
+    chunks = load_chunks()
+    query_texts = (
+        [line.strip() for line in args.queries.read_text(encoding="utf-8").splitlines() if line.strip()]
+        if args.queries else DEFAULT_QUERIES
+    )
+    model = SentenceTransformer(DocumentRetriever.EMBEDDING_MODEL)
+    embs = model.encode(chunks, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+    queries = model.encode(query_texts, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+    print(f"{len(chunks)} chunks, {len(queries)} queries, k={args.k}, backend={args.backend}\n")
+
+    # exact top-k as ground truth
+    truth = [set(np.argsort(-(embs @ q))[:args.k]) for q in queries]
+
+    runner = run_milvus if args.backend == "milvus" else run_local
+    rows = []
+    print(f"{'config':<52} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'mem MB':>8}")
+    for index_params, search_params, built, results, latencies, memory_mb in runner(embs, queries, args.k):
+        recall = statistics.mean(len(truth[i] & set(res)) / args.k for i, res in enumerate(results))
+        lat_ms = sorted(latency * 1000 for latency in latencies)
+        row = {
+            "index_params": index_params,
+            "search_params": search_params,
+            "built_index_type": built,
+            "recall": recall,
+            "p50_ms": lat_ms[len(lat_ms) // 2],
+            "p95_ms": lat_ms[min(len(lat_ms) - 1, int(len(lat_ms) * 0.95))],
+            "memory_mb": memory_mb,
+        }
+        rows.append(row)
+        print(f"{label(index_params, search_params, built):<52} {recall:>9.3f} "
+              f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {memory_mb:>8.1f}")
+
+    if args.out:
+        args.out.write_text(json.dumps(rows, indent=2))
+
+    good = [row for row in rows if row["recall"] >= args.min_recall]
+    if good:
+        best = min(good, key=lambda row: row["p95_ms"])
+        print(f"\nFastest config with recall@{args.k} >= {args.min_recall}:")
+        print(f"  RAG_INDEX_PARAMS='{json.dumps(best['index_params'])}'")
+        print(f"  RAG_SEARCH_PARAMS='{json.dumps(best['search_params'])}'")
+        if best["built_index_type"] != best["index_params"]["index_type"]:
+            print(f"  (measured as {best['built_index_type']}: {len(chunks)} chunks are too few "
+                  f"to train {best['index_params']['index_type']})")
+
+
+if __name__ == "__main__":
+    main()
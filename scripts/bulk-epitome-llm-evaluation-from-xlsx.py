@@ -1,5 +1,4 @@
 import pandas as pd
-from backend.services.epitome_evaluation import call_epitome_model
 import sys
 import pathlib
 
@@ -7,26 +6,47 @@ import pathlib
 PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from backend.services.epitome_batch import evaluate_pairs  # noqa: E402
+from backend.services.epitome_evaluation import epitome_cache  # noqa: E402
+
 INPUT_PATH = "data/empatheticdialogues_epitome_llm_evaluation_100.xlsx"
 OUTPUT_PATH = "data/empatheticdialogues_epitome_llm_evaluation_100.xlsx"  # Overwrite original
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 4.0
+# responder messages scored per LLM call
+PACK_SIZE = 8
 
 
 def batch_evaluate_xlsx(input_path: str, output_path: str):
     df = pd.read_excel(input_path, engine="openpyxl")
 
-    for idx, row in df.iterrows():
-        seeker = row['seeker_text']
-        responder = row['response_text']
-        if pd.isna(seeker) or pd.isna(responder):
+    rows = [
+        (idx, row['seeker_text'], row['response_text'])
+        for idx, row in df.iterrows()
+        if not (pd.isna(row['seeker_text']) or pd.isna(row['response_text']))
+    ]
+    results = evaluate_pairs(
+        ((seeker, responder) for _, seeker, responder in rows),
+        max_workers=MAX_WORKERS,
+        requests_per_second=REQUESTS_PER_SECOND,
+        pack_size=PACK_SIZE,
+    )
+    for done, res in enumerate(results, start=1):
+        idx = rows[res.index][0]
+        if res.error is not None:
+            print(f"[{done}/{len(rows)}] Failed conv_id={df.at[idx, 'conv_id']}: {res.error}")
             continue
-        result = call_epitome_model(seeker, responder)
+        result = res.evaluation
         df.at[idx, 'Emotional_Reactions'] = result['emotional_reactions']['score']
         df.at[idx, 'Rationale_ER'] = result['emotional_reactions']['rationale']
         df.at[idx, 'Interpretations'] = result['interpretations']['score']
         df.at[idx, 'Rationale_IN'] = result['interpretations']['rationale']
         df.at[idx, 'Explorations'] = result['explorations']['score']
         df.at[idx, 'Rationale_EX'] = result['explorations']['rationale']
-        print(f"[{idx + 1}/{len(df)}] Evaluated conv_id={row['conv_id']}")
+        print(f"[{done}/{len(rows)}] Evaluated conv_id={df.at[idx, 'conv_id']}")
+
+    stats = epitome_cache.stats()
+    print(f"EPITOME cache: {stats['hits']} hits / {stats['misses']} misses (hit rate {stats['hit_rate']:.0%})")
 
     df.to_excel(output_path, index=False, engine="openpyxl")
     print(f"Batch evaluation complete. Results written to {output_path}")
@@ -0,0 +1,33 @@
+# scripts/healthcheck.py
+# Container healthcheck: Streamlit must answer and the shared retriever must
+# have finished warming up (see backend/llm/registry.py).
+
+import pathlib
+import sys
+import urllib.request
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from backend.llm.registry import READY_FILE  # noqa: E402
+
+HEALTH_URL = "http://localhost:8501/_stcore/health"
+
+
+def main() -> int:
+    try:
+        with urllib.request.urlopen(HEALTH_URL, timeout=5) as resp:
+            if resp.status != 200:
+                print(f"streamlit unhealthy: HTTP {resp.status}")
+                return 1
+    except Exception as e:
+        print(f"streamlit unreachable: {e}")
+        return 1
+    if not READY_FILE.exists():
+        print("retriever still warming up")
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
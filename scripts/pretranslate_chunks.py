@@ -0,0 +1,25 @@
+# scripts/pretranslate_chunks.py
+# Fill the chunk_translations cache for every indexed chunk, so English chat
+# turns never have to translate context on the hot path.
+
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from backend.database.db import create_tables  # noqa: E402
+from backend.llm.context_translator import ContextTranslator  # noqa: E402
+from backend.llm.document_retriever_RAG import DocumentRetriever  # noqa: E402
+from backend.llm.replicate_client_chatbot import ReplicateClientChatbot  # noqa: E402
+
+
+def main(target_lang: str = "en"):
+    create_tables()
+    retriever = DocumentRetriever()
+    translator = ContextTranslator(ReplicateClientChatbot.DEFAULT_MODEL)
+    translated = translator.prefill(retriever.store.iter_texts(), target_lang=target_lang)
+    print(f"Translated {translated} new chunks into '{target_lang}'.")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
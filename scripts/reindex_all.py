@@ -1,23 +1,23 @@
 # reindex_all.py
-import json
 import pathlib
+from backend.llm.doc_manifest import DocManifest, sync_directory
 from backend.llm.document_retriever_RAG import DocumentRetriever
 
-# 1) Initialize retriever (this will recreate the 'documents' collection)
+# 1) Initialize retriever (opens the existing 'documents' collection)
 retriever = DocumentRetriever()
 
-# 2) Load your manifest of filenames
+# 2) Load the manifest of file and chunk hashes
 DATA_DIR = pathlib.Path("data")
 MANIFEST_PATH = DATA_DIR / "doc_manifest.json"
-existing = set(json.loads(MANIFEST_PATH.read_text()))
+manifest = DocManifest.load(MANIFEST_PATH)
 
-# 3) For each manifest file, re-add it into Milvus
+# 3) Re-embed only changed chunks, drop vectors of removed chunks and files
 DOCS_DIR = pathlib.Path("docs")
-for fname in existing:
-    path = DOCS_DIR / fname
-    if path.exists():
-        print(f"Indexing {fname}…")
-        retriever.add_file(str(path))
+for result in sync_directory(retriever, manifest, DOCS_DIR):
+    if result.error:
+        print(f"⚠️ {result.name}: {result.error}")
+    elif result.unchanged:
+        print(f"{result.name}: unchanged")
     else:
-        print(f"⚠️ File missing on disk: {fname}")
+        print(f"{result.name}: +{result.added} / -{result.removed} chunks ({result.kept} kept)")
 print("✅ Reindexing complete.")
@@ -0,0 +1,67 @@
+# scripts/serve.py
+# Run Streamlit in this process and warm the shared retriever alongside it,
+# so every page uses the already-loaded model and index. Once warm, the
+# readiness file is written and new/changed documents in docs/ are synced.
+# Replicate call metrics are served on METRICS_PORT (backend/utils/metrics.py)
+# and the EPITOME job workers start right away to drain any queued jobs.
+# The language-ID profiles are loaded before the first message needs them.
+#
+#   python scripts/serve.py frontend/0_Intro.py --server.port 8501
+
+import pathlib
+import sys
+import threading
+import traceback
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from streamlit.web import cli as stcli  # noqa: E402
+
+from backend.llm import registry  # noqa: E402
+from backend.llm.language_id import get_detector_factory  # noqa: E402
+from backend.utils.metrics import start_metrics_server  # noqa: E402
+from scripts import preload_documents  # noqa: E402
+
+
+def warm_and_preload():
+    try:
+        get_detector_factory()
+    except Exception:
+        print("⚠️ Language-ID profiles not loaded, they load on first use")
+        traceback.print_exc()
+    try:
+        retriever = registry.warm_up()
+    except Exception:
+        print("⚠️ Warm-up failed, pages will load the retriever on first use")
+        traceback.print_exc()
+        return
+    try:
+        preload_documents.main(retriever)
+    except Exception:
+        print("⚠️ Preload failed, continuing...")
+        traceback.print_exc()
+
+
+def start_epitome_workers():
+    # drains EPITOME jobs left over from before a restart without waiting for chat traffic
+    try:
+        from backend.database.db import create_tables
+        from backend.services.epitome_queue import get_worker_pool
+        create_tables()
+        get_worker_pool()
+    except Exception:
+        print("⚠️ EPITOME workers not started, they start with the first chat message")
+        traceback.print_exc()
+
+
+def main():
+    registry.clear_ready()
+    start_metrics_server()
+    start_epitome_workers()
+    threading.Thread(target=warm_and_preload, name="warm-up", daemon=True).start()
+    sys.argv = ["streamlit", "run", *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
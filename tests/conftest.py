@@ -0,0 +1,18 @@
+import pathlib
+import sys
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point backend.database.db at a fresh SQLite file for one test."""
+    from backend.database import db
+
+    path = tmp_path / "database.db"
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.close_connections()
+    yield path
+    db.close_connections()
@@ -0,0 +1,83 @@
+from backend.llm.replicate_client_chatbot import ReplicateClientChatbot
+
+
+class Event:
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return self.data
+
+
+class FakeClient:
+    """Replicate client whose stream yields one event per next() call."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+        self.finished = False
+
+    def stream(self, model, input):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield Event(chunk)
+        yield Event("")  # the closing "done" event has no output
+        self.finished = True
+
+    def run(self, *args, **kwargs):
+        raise AssertionError("run() waits for the whole prediction")
+
+
+def test_stream_response_yields_each_event_as_it_arrives(temp_db):
+    chatbot = ReplicateClientChatbot(api_token="token")
+    chatbot.client = FakeClient(["Hallo", ", wie", " geht's?"])
+
+    stream = chatbot.stream_response("Wie geht es dir heute?", system_prompt="Sei nett.", docs=[])
+
+    assert next(stream) == "Hallo"
+    assert chatbot.client.sent == 1 and not chatbot.client.finished
+    assert list(stream) == [", wie", " geht's?"]
+    assert chatbot.client.finished
+
+
+def test_only_chunks_within_the_budget_are_translated(temp_db, monkeypatch):
+    from backend.llm import prompt_budget
+
+    monkeypatch.setattr(prompt_budget, "PROMPT_TOKEN_BUDGET", 300)
+    chatbot = ReplicateClientChatbot(api_token="token")
+    translated = []
+    monkeypatch.setattr(
+        chatbot.translator, "translate",
+        lambda chunks, target_lang="en": translated.extend(chunks) or [f"EN {c}" for c in chunks],
+    )
+    docs = [f"Abschnitt {i}: " + "Wort " * 60 for i in range(10)]
+    trace = {}
+
+    payload = chatbot._build_payload(
+        "What helps against fatigue during chemotherapy?", None, "Be kind.", 1.0, 1.0, docs, trace
+    )
+
+    assert 0 < len(translated) < len(docs)
+    assert translated == docs[:len(translated)]
+    assert "EN Abschnitt 0" in payload["prompt"]
+
+
+def test_translator_uses_the_chatbot_client_settings(temp_db, monkeypatch):
+    from backend.llm import context_translator
+
+    clients = []
+
+    class Client:
+        def stream(self, model, input):
+            clients.append(input["max_completion_tokens"])
+            yield Event("Hello")
+
+    def get_client(api_token=None, timeout=None):
+        clients.append((api_token, timeout))
+        return Client()
+
+    monkeypatch.setattr(context_translator, "get_replicate_client", get_client)
+    chatbot = ReplicateClientChatbot(api_token="token", timeout=(2, 30), max_completion_tokens=256)
+
+    assert chatbot.translator._translate_one("Hallo", "en") == "Hello"
+    assert clients == [("token", (2, 30)), 256]
@@ -0,0 +1,119 @@
+import sqlite3
+
+import pytest
+
+from backend.database import db
+
+
+def _legacy_db(path):
+    """A database as it looked before the first migration (no unique index)."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE chat_pairs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT NOT NULL,
+            pair_number INTEGER NOT NULL,
+            user_input TEXT NOT NULL,
+            llm_response TEXT NOT NULL,
+            epitome_eval TEXT,
+            user_feedback TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            prompt_id INTEGER
+        )
+    """)
+    return conn
+
+
+def _pairs(chat_id):
+    return [
+        dict(row) for row in db.get_connection().execute(
+            "SELECT pair_number, user_input, epitome_eval, user_feedback, feedback_rating "
+            "FROM chat_pairs WHERE chat_id = ? ORDER BY pair_number", (chat_id,)
+        )
+    ]
+
+
+def test_identical_duplicates_are_merged_keeping_eval_and_feedback(temp_db):
+    evaluation = '{"emotional_reactions": {"score": 2, "rationale": "x"}}'
+    conn = _legacy_db(temp_db)
+    conn.executemany(
+        "INSERT INTO chat_pairs (chat_id, pair_number, user_input, llm_response, epitome_eval, user_feedback) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            ("c1", 1, "hi", "hello", evaluation, None),
+            ("c1", 1, "hi", "hello", None, "Rating: 4/5"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    db.create_tables()
+
+    assert _pairs("c1") == [{
+        "pair_number": 1, "user_input": "hi", "epitome_eval": evaluation,
+        "user_feedback": "Rating: 4/5", "feedback_rating": 4,
+    }]
+
+
+def test_conflicting_duplicates_are_renumbered_not_deleted(temp_db):
+    conn = _legacy_db(temp_db)
+    conn.executemany(
+        "INSERT INTO chat_pairs (chat_id, pair_number, user_input, llm_response, user_feedback) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            ("c1", 1, "first", "a", "Rating: 5/5"),
+            ("c1", 2, "second", "b", None),
+            ("c1", 1, "third", "c", "Rating: 2/5"),
+            ("c2", 1, "other chat", "d", None),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    db.create_tables()
+
+    assert [(p["pair_number"], p["user_input"], p["feedback_rating"]) for p in _pairs("c1")] == [
+        (1, "first", 5), (2, "second", None), (3, "third", 2),
+    ]
+    assert len(_pairs("c2")) == 1
+    stats = {row["prompt_id"]: row["pairs"] for row in db.get_connection().execute("SELECT * FROM prompt_stats")}
+    assert stats == {0: 4}
+
+
+def test_migrations_are_idempotent(temp_db):
+    db.create_tables()
+    db.insert_chat_pair("c1", 1, "hi", "hello")
+    db.create_tables()
+
+    version = db.get_connection().execute("PRAGMA user_version").fetchone()[0]
+    assert version == len(db.MIGRATIONS)
+    assert len(_pairs("c1")) == 1
+
+
+def test_rebuild_prompt_stats_commits_its_own_transaction(temp_db):
+    db.create_tables()
+    db.insert_chat_pair("chat", 1, "q", "a")
+    conn = db.get_connection()
+    conn.execute("DELETE FROM prompt_stats")
+    conn.commit()
+
+    db.rebuild_prompt_stats()
+
+    assert not conn.in_transaction
+    assert conn.execute("SELECT pairs FROM prompt_stats").fetchone()[0] == 1
+
+
+def test_connections_of_finished_threads_are_closed(temp_db):
+    import threading
+
+    opened = []
+    worker = threading.Thread(target=lambda: opened.append(db.get_connection()))
+    worker.start()
+    worker.join()
+
+    # the next thread that connects sweeps the finished one
+    sweeper = threading.Thread(target=db.get_connection)
+    sweeper.start()
+    sweeper.join()
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
@@ -0,0 +1,45 @@
+from backend.database import db
+
+
+def _seed(count):
+    db.create_tables()
+    conn = db.get_connection()
+    for n in range(1, count + 1):
+        db.insert_chat_pair("chat", n, f"question {n}", f"answer {n}")
+    # two timestamps only, so most of the order comes from the id tie-breaker
+    conn.execute("UPDATE chat_pairs SET timestamp = '2024-01-01 10:00:00' WHERE pair_number <= 4")
+    conn.execute("UPDATE chat_pairs SET timestamp = '2024-01-02 10:00:00' WHERE pair_number > 4")
+    conn.commit()
+
+
+def _walk(limit, **filters):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = db.get_chat_pairs_page(limit=limit, after=cursor, **filters)
+        pages.append([row["pair_number"] for row in rows])
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_every_pair_once_newest_first(temp_db):
+    _seed(7)
+    assert _walk(3) == [[7, 6, 5], [4, 3, 2], [1]]
+    assert db.count_chat_pairs() == 7
+
+
+def test_last_full_page_has_no_cursor(temp_db):
+    _seed(6)
+    assert _walk(3) == [[6, 5, 4], [3, 2, 1]]
+
+
+def test_filters_apply_to_pages_and_count(temp_db):
+    _seed(7)
+    for n in (2, 5, 6):
+        db.update_epitome_eval("chat", n, {"emotional_reactions": {"score": 1, "rationale": ""}})
+    db.update_user_feedback("chat", 1, "4")
+    db.update_user_feedback("chat", 7, "2")
+
+    assert _walk(2, missing_eval=True) == [[7, 4], [3, 1]]
+    assert db.count_chat_pairs(missing_eval=True) == 4
+    assert _walk(10, min_rating=3, max_rating=5) == [[1]]
+    assert db.count_chat_pairs(min_rating=1, max_rating=5) == 2
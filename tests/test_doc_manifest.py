@@ -0,0 +1,139 @@
+import json
+
+import pytest
+
+from backend.llm.doc_manifest import DocManifest, sync_file
+
+
+class FakeRetriever:
+    """In-memory stand-in for DocumentRetriever: one chunk per line of the file."""
+    embedding_model_name = "model-a"
+    CHUNK_SIZE = 500
+    CHUNK_OVERLAP = 100
+    batch_size = 2
+
+    def __init__(self):
+        self.rows = {}  # id -> (source, text)
+        self.next_id = 1
+        self.max_batch = 0
+        self.fail_after = None
+
+    def iter_file_chunks(self, path, on_page=None):
+        lines = [line for line in open(path, encoding="utf-8").read().splitlines() if line]
+        for i, line in enumerate(lines, start=1):
+            yield line
+            if on_page:
+                on_page(i, len(lines))
+
+    def add_chunks(self, chunks, source, metadata=None, on_batch=None):
+        assert not isinstance(chunks, list), "chunks must be streamed"
+        ids, batch = [], []
+
+        def insert():
+            self.max_batch = max(self.max_batch, len(batch))
+            for text in batch:
+                if self.fail_after is not None and len(ids) >= self.fail_after:
+                    raise RuntimeError("embedding failed")
+                self.rows[self.next_id] = (source, text)
+                ids.append(self.next_id)
+                self.next_id += 1
+            batch.clear()
+            if on_batch:
+                on_batch(len(ids))
+
+        try:
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    insert()
+            if batch:
+                insert()
+        except Exception:
+            self.delete_ids(ids)
+            raise
+        return ids
+
+    def delete_ids(self, ids):
+        for pk in ids:
+            self.rows.pop(pk, None)
+
+    def delete_source(self, source):
+        self.rows = {pk: row for pk, row in self.rows.items() if row[0] != source}
+
+    def texts(self, source="doc.json"):
+        return sorted(text for s, text in self.rows.values() if s == source)
+
+
+@pytest.fixture
+def setup(tmp_path):
+    path = tmp_path / "doc.json"
+    manifest = DocManifest(tmp_path / "manifest.json")
+    return FakeRetriever(), manifest, path
+
+
+def test_only_changed_chunks_are_embedded_in_bounded_batches(setup):
+    retriever, manifest, path = setup
+    path.write_text("a\nb\nc\nd\ne\n", encoding="utf-8")
+    first = sync_file(retriever, manifest, path)
+    assert (first.added, first.removed) == (5, 0)
+    assert retriever.max_batch == 2
+
+    path.write_text("a\nb\nX\nd\ne\nY\n", encoding="utf-8")
+    progress = []
+    second = sync_file(retriever, manifest, path, lambda *args: progress.append(args))
+    assert (second.added, second.removed, second.kept) == (2, 1, 4)
+    assert retriever.texts() == ["X", "Y", "a", "b", "d", "e"]
+    assert progress[-1] == (6, 6, 2)
+
+    stored = json.loads(manifest.path.read_text())["files"]["doc.json"]
+    assert sorted(pk for ids in stored["chunks"].values() for pk in ids) == sorted(retriever.rows)
+    assert sync_file(retriever, manifest, path).unchanged
+
+
+def test_failed_embed_keeps_previous_version(setup):
+    retriever, manifest, path = setup
+    path.write_text("a\nb\n", encoding="utf-8")
+    sync_file(retriever, manifest, path)
+    before = dict(manifest.files["doc.json"])
+
+    path.write_text("a\nb\nc\nd\ne\n", encoding="utf-8")
+    retriever.fail_after = 2
+    with pytest.raises(RuntimeError):
+        sync_file(retriever, manifest, path)
+
+    assert retriever.texts() == ["a", "b"]
+    assert DocManifest.load(manifest.path).files["doc.json"] == before
+
+
+def test_interrupted_sync_is_redone_from_scratch(setup):
+    retriever, manifest, path = setup
+    path.write_text("a\nb\n", encoding="utf-8")
+    sync_file(retriever, manifest, path)
+
+    # the process died after inserting "c" but before the final save
+    path.write_text("a\nb\nc\n", encoding="utf-8")
+    original_add = retriever.add_chunks
+
+    def add_then_die(chunks, *args, **kwargs):
+        original_add(chunks, *args, **kwargs)
+        raise KeyboardInterrupt
+
+    retriever.add_chunks = add_then_die
+    with pytest.raises(KeyboardInterrupt):
+        sync_file(retriever, manifest, path)
+    assert DocManifest.load(manifest.path).files["doc.json"]["chunks"] is None
+
+    retriever.add_chunks = original_add
+    result = sync_file(retriever, manifest, path)
+    assert result.added == 3
+    assert retriever.texts() == ["a", "b", "c"]
+
+
+def test_legacy_manifest_reindexes(setup):
+    retriever, manifest, path = setup
+    retriever.rows[99] = ("doc.json", "old")
+    manifest.path.write_text(json.dumps(["doc.json"]))
+    path.write_text("a\n", encoding="utf-8")
+    result = sync_file(retriever, DocManifest.load(manifest.path), path)
+    assert result.added == 1
+    assert retriever.texts() == ["a"]
@@ -0,0 +1,18 @@
+from backend.llm.embedding_cache import EmbeddingCache, normalize_query
+
+
+def test_whitespace_and_compatibility_forms_share_an_entry():
+    assert normalize_query("  Was hilft\tgegen\n Müdigkeit? ") == "Was hilft gegen Müdigkeit?"
+    # NFKC: full-width letters and the "ﬁ" ligature
+    assert normalize_query("Ｋrebs ﬁeber") == "Krebs fieber"
+
+
+def test_queries_differing_only_in_case_get_different_entries():
+    cache = EmbeddingCache()
+    cache.put("e5", "Krebs", [1.0])
+    cache.put("e5", "krebs", [2.0])
+
+    assert cache.get("e5", "Krebs") == [1.0]
+    assert cache.get("e5", " krebs ") == [2.0]
+    assert cache.get("e5", "KREBS") is None
+    assert cache.stats()["size"] == 2
@@ -0,0 +1,75 @@
+import httpx
+
+from backend.services import epitome_batch
+from backend.services.epitome_batch import evaluate_pairs
+from backend.services.epitome_evaluation import EpitomeValidationError
+
+PAIRS = [(f"question {i}", f"answer {i}") for i in range(4)]
+
+
+def run(batch_evaluator, evaluator=None):
+    results = evaluate_pairs(
+        PAIRS,
+        max_workers=2,
+        requests_per_second=None,
+        backoff_base=0,
+        pack_size=4,
+        batch_evaluator=batch_evaluator,
+        evaluator=evaluator or (lambda u, r: {"single": r}),
+    )
+    return {result.index: result for result in results}
+
+
+def test_failing_item_does_not_fail_its_pack():
+    def batch(pairs, return_exceptions=False, fallback=None):
+        assert return_exceptions
+        return [
+            EpitomeValidationError("bad reply", "...") if r == "answer 2" else {"batch": r}
+            for _, r in pairs
+        ]
+
+    results = run(batch)
+
+    assert isinstance(results[2].error, EpitomeValidationError)
+    assert results[2].evaluation is None
+    for index in (0, 1, 3):
+        assert results[index].error is None
+        assert results[index].evaluation == {"batch": f"answer {index}"}
+
+
+def test_transient_item_error_is_retried_alone():
+    def batch(pairs, return_exceptions=False, fallback=None):
+        return [httpx.ConnectError("reset") if r == "answer 1" else {"batch": r} for _, r in pairs]
+
+    results = run(batch)
+
+    assert results[1].error is None
+    assert results[1].evaluation == {"single": "answer 1"}
+    assert results[1].attempts == 2
+    assert results[0].evaluation == {"batch": "answer 0"}
+
+
+def test_failing_pack_call_reports_error_on_every_pair():
+    def batch(pairs, return_exceptions=False, fallback=None):
+        raise ValueError("boom")
+
+    results = run(batch)
+
+    assert all(isinstance(r.error, ValueError) and r.evaluation is None for r in results.values())
+
+
+def test_one_by_one_fallback_takes_a_rate_limit_token_per_pair(monkeypatch):
+    acquired = []
+    monkeypatch.setattr(epitome_batch.TokenBucket, "acquire", lambda self, tokens=1.0: acquired.append(tokens))
+
+    def batch(pairs, return_exceptions=False, fallback=None):
+        # the batched reply was unusable: every pair is evaluated on its own
+        return [fallback(u, r) for u, r in pairs]
+
+    results = evaluate_pairs(
+        PAIRS, max_workers=1, requests_per_second=1000, pack_size=4,
+        batch_evaluator=batch, evaluator=lambda u, r: {"single": r},
+    )
+
+    assert sorted(r.evaluation["single"] for r in results) == [r for _, r in PAIRS]
+    assert len(acquired) == 1 + len(PAIRS)  # the pack call, then one per pair
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from backend.services import epitome_evaluation as ev
+from backend.services.epitome_cache import EpitomeCache
+
+RESPONSES = [
+    "I am so sorry you are going through this. How are you holding up?",
+    "That sounds really hard. You must feel exhausted.",
+    "Have you talked to your doctor about it?",
+]
+
+
+def item(id_, quote=""):
+    score = 1 if quote else 0
+    return {
+        "id": id_,
+        "emotional_reactions": {"score": score, "rationale": quote},
+        "interpretations": {"score": 0, "rationale": ""},
+        "explorations": {"score": 0, "rationale": ""},
+    }
+
+
+def test_exact_ids_are_accepted_in_any_order():
+    parsed = [item(3), item(1, "I am so sorry"), item(2, "That sounds really hard.")]
+    matched = ev.match_batch_items(parsed, RESPONSES)
+    assert sorted(matched) == [1, 2, 3]
+    assert matched[1]["emotional_reactions"]["rationale"] == "I am so sorry"
+    assert "id" not in matched[1]
+
+
+@pytest.mark.parametrize("ids", [
+    [0, 1, 2],      # 0-based
+    [2, 3, 4],      # shifted
+    [1, 1, 2],      # duplicate
+    [1, 2],         # missing
+    [1, 2, 3, 4],   # extra
+    [None, None, None],
+    ["1", "2", "3"],
+])
+def test_unexpected_ids_reject_the_whole_batch(ids):
+    parsed = [item(i) for i in ids]
+    assert ev.match_batch_items(parsed, RESPONSES) == {}
+
+
+def test_item_quoting_another_responder_is_rejected():
+    # ids look fine, but item 1 quotes responder 2
+    parsed = [item(1, "You must feel exhausted"), item(2, "That sounds really hard"), item(3)]
+    assert sorted(ev.match_batch_items(parsed, RESPONSES)) == [2, 3]
+
+
+def test_paraphrased_rationale_is_not_treated_as_misattribution():
+    parsed = [item(1, "expresses sorrow"), item(2), item(3)]
+    assert sorted(ev.match_batch_items(parsed, RESPONSES)) == [1, 2, 3]
+
+
+class FakeClient:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def run(self, model, input=None, **params):
+        return self.raw
+
+
+def test_batch_falls_back_per_item_on_shifted_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(ev, "epitome_cache", EpitomeCache(tmp_path / "cache.db"))
+    shifted = [item(i, "") for i in (0, 1, 2)]
+    monkeypatch.setattr(ev, "get_replicate_client", lambda: FakeClient(json.dumps(shifted)))
+    single = []
+
+    def fake_single(user_input, llm_response, use_cache=True):
+        single.append(llm_response)
+        return {k: v for k, v in item(0, llm_response[:5]).items() if k != "id"}
+
+    monkeypatch.setattr(ev, "call_epitome_model", fake_single)
+
+    results = ev.call_epitome_model_batch([("u", r) for r in RESPONSES], use_cache=False)
+
+    assert single == RESPONSES
+    assert [r["emotional_reactions"]["rationale"] for r in results] == [r[:5] for r in RESPONSES]
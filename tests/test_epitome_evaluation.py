@@ -0,0 +1,28 @@
+import json
+
+from backend.services import epitome_evaluation as ev
+
+EVALUATION = {
+    "emotional_reactions": {"score": 2, "rationale": "warm"},
+    "interpretations": {"score": 1, "rationale": "mirrors the fear"},
+    "explorations": {"score": 0, "rationale": "no questions"},
+}
+
+
+class RecordingClient:
+    def __init__(self):
+        self.calls = []
+
+    def run(self, model, **kwargs):
+        self.calls.append(kwargs)
+        return [json.dumps(EVALUATION)]
+
+
+def test_run_epitome_model_sends_temperature_as_model_input(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(ev, "get_replicate_client", lambda *args, **kwargs: client)
+
+    assert ev.run_epitome_model("prompt") == EVALUATION
+    [call] = client.calls
+    assert call["input"] == {"prompt": "prompt", "temperature": 0.0}
+    assert "temperature" not in call
@@ -0,0 +1,45 @@
+import time
+
+import httpx
+from replicate.exceptions import ReplicateError
+
+from backend.database import db
+from backend.services.epitome_queue import EpitomeWorkerPool
+
+
+def _run_one(evaluator):
+    db.create_tables()
+    db.insert_chat_pair("chat", 1, "Ich habe Angst.", "Das verstehe ich.")
+    job_id = db.enqueue_epitome_job("chat", 1, "Ich habe Angst.", "Das verstehe ich.")
+    pool = EpitomeWorkerPool(evaluator=evaluator, backoff_base=0.01)
+    [job] = db.claim_epitome_jobs(1, time.time())
+    pool._process(job)
+    return db.get_connection().execute(
+        "SELECT status, attempts, last_error FROM epitome_jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+
+
+def _raise(exc):
+    def evaluator(user_input, llm_response):
+        raise exc
+    return evaluator
+
+
+def test_invalid_model_output_fails_the_job_right_away(temp_db):
+    job = _run_one(_raise(RuntimeError("EPITOME reply is not valid JSON")))
+    assert job["status"] == "dead"
+    assert job["attempts"] == 1
+    assert "not valid JSON" in job["last_error"]
+
+
+def test_network_errors_are_retried(temp_db):
+    assert _run_one(_raise(httpx.ConnectError("connection refused")))["status"] == "pending"
+
+
+def test_rate_limited_job_is_retried(temp_db):
+    assert _run_one(_raise(ReplicateError(status=429, detail="slow down")))["status"] == "pending"
+
+
+def test_successful_job_is_done(temp_db):
+    evaluation = {"emotional_reactions": {"score": 2, "rationale": "warm"}}
+    assert _run_one(lambda user_input, llm_response: evaluation)["status"] == "done"
@@ -0,0 +1,43 @@
+import json
+
+from backend.services.epitome_evaluation import JsonObjectScanner
+
+OBJECT = {
+    "emotional_reactions": {"score": 2, "rationale": 'says "I {really} feel for you" \\ warmly'},
+    "interpretations": {"score": 1, "rationale": "[mirrors] the fatigue"},
+    "explorations": {"score": 0, "rationale": "no questions"},
+}
+
+
+def _feed_all(chunks):
+    scanner = JsonObjectScanner()
+    results = [scanner.feed(chunk) for chunk in chunks]
+    return scanner, results
+
+
+def test_object_is_returned_once_its_closing_brace_arrives():
+    text = json.dumps(OBJECT)
+    scanner, results = _feed_all([text[:10], text[10:-1], text[-1:]])
+    assert results[:2] == [None, None]
+    assert json.loads(results[2]) == OBJECT
+
+
+def test_braces_and_escaped_quotes_inside_strings_are_ignored():
+    text = json.dumps(OBJECT)
+    # one character at a time, so every escape straddles a chunk boundary
+    _, results = _feed_all(list(text))
+    assert results[:-1] == [None] * (len(text) - 1)
+    assert json.loads(results[-1]) == OBJECT
+
+
+def test_fences_and_chatter_before_the_object_are_skipped():
+    text = "Here is the evaluation:\n```json\n" + json.dumps(OBJECT) + "\n```\nanything else"
+    _, results = _feed_all([text[:20], text[20:]])
+    assert results[0] is None
+    assert json.loads(results[1]) == OBJECT
+
+
+def test_incomplete_object_returns_none():
+    scanner = JsonObjectScanner()
+    assert scanner.feed('```json\n{"emotional_reactions": {"score": 2') is None
+    assert scanner.feed(', "rationale": "}"}') is None
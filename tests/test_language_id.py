@@ -0,0 +1,50 @@
+import pytest
+
+from backend.llm import language_id
+from backend.llm.language_id import detect_language, quick_guess
+
+LONG_ENGLISH = "Everything feels overwhelming lately, sleeping badly, constantly anxious"
+LONG_FRENCH = "Quels sont les effets secondaires de la chimiothérapie pendant plusieurs mois"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ok danke", "de"),
+    ("Übelkeit", "de"),
+    ("Ich habe Angst vor der Chemo", "de"),
+    ("What should I do?", "en"),
+    ("ok thanks", "en"),
+    ("ok", None),
+    ("chemotherapy", None),
+    # ambiguous words don't vote
+    ("was die also", None),
+])
+def test_quick_guess(text, expected):
+    assert quick_guess(text) == expected
+
+
+def test_long_unclear_text_is_detected():
+    assert detect_language(LONG_ENGLISH) == "en"
+
+
+def test_detection_is_deterministic():
+    assert {detect_language(LONG_FRENCH) for _ in range(20)} == {"fr"}
+
+
+def test_short_unclear_text_uses_default_without_session():
+    assert detect_language("ok") == language_id.LANGID_DEFAULT
+
+
+def test_session_language_only_covers_short_messages():
+    sid = "test-session-short"
+    assert detect_language("ok thanks", sid) == "en"
+    assert detect_language("ok", sid) == "en"
+    assert detect_language("hmm", sid) == "en"
+
+
+def test_session_language_does_not_override_long_messages():
+    sid = "test-session-long"
+    assert detect_language("ok danke", sid) == "de"
+    assert detect_language(LONG_ENGLISH, sid) == "en"
+    assert detect_language(LONG_FRENCH, sid) == "fr"
+    # the last confident answer is what short follow-ups get
+    assert detect_language("ok", sid) == "fr"
@@ -0,0 +1,84 @@
+import json
+
+from backend.llm.vector_store import LocalVectorStore
+
+
+def _rows(*vectors, source="a.pdf"):
+    return [
+        {"text": f"chunk {i}", "embedding": vector, "source": source, "metadata": "{}"}
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def test_insert_extends_memory_without_reparsing(tmp_path, monkeypatch):
+    store = LocalVectorStore("docs", 2, directory=tmp_path)
+    reloads = []
+    original = store._reload
+    monkeypatch.setattr(store, "_reload", lambda: (reloads.append(1), original())[1])
+
+    first = store.insert(_rows([1, 0], [0, 1]))
+    second = store.insert(_rows([1, 1]))
+
+    assert first == [1, 2] and second == [3]
+    assert reloads == []
+    hits = store.search([[1, 0]], top_k=3)[0]
+    assert [hit["id"] for hit in hits][0] == 1
+    assert len(hits) == 3
+
+
+def test_changes_from_another_process_are_picked_up(tmp_path):
+    store = LocalVectorStore("docs", 2, directory=tmp_path)
+    store.insert(_rows([1, 0]))
+
+    other = LocalVectorStore("docs", 2, directory=tmp_path)
+    other.insert(_rows([0, 1], source="b.pdf"))
+
+    ids = store.insert(_rows([1, 1]))
+    assert ids == [3]
+    assert [r["id"] for r in store._records] == [1, 2, 3]
+    assert store.search([[0, 1]], top_k=1)[0][0]["source"] == "b.pdf"
+    lines = (tmp_path / "docs" / "records.jsonl").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+
+def test_delete_rewrites_and_keeps_appending(tmp_path):
+    store = LocalVectorStore("docs", 2, directory=tmp_path)
+    store.insert(_rows([1, 0], [0, 1]))
+    store.delete_by_source("a.pdf")
+    assert store.insert(_rows([0, 1], source="b.pdf")) == [3]
+    assert [hit["id"] for hit in store.search([[0, 1]], top_k=5)[0]] == [3]
+
+
+def test_search_and_delete_see_rows_from_another_instance(tmp_path):
+    reader = LocalVectorStore("docs", 2, directory=tmp_path)
+    writer = LocalVectorStore("docs", 2, directory=tmp_path)
+    writer.insert(_rows([1, 0], [0, 1], [1, 1]))
+
+    assert [hit["id"] for hit in reader.search([[1, 0]], top_k=1)[0]] == [1]
+    assert list(reader.iter_texts()) == ["chunk 0", "chunk 1", "chunk 2"]
+
+    writer.insert(_rows([0, 1], source="b.pdf"))
+    reader.delete_ids([2])
+    writer.delete_by_source("b.pdf")
+
+    # the reader's delete kept the writer's other rows, and vice versa
+    assert [hit["id"] for hit in writer.search([[0, 1]], top_k=5)[0]] == [3, 1]
+    assert [hit["id"] for hit in reader.search([[0, 1]], top_k=5)[0]] == [3, 1]
+
+
+def test_a_torn_insert_is_ignored_and_cut_off(tmp_path):
+    store = LocalVectorStore("docs", 2, directory=tmp_path)
+    store.insert(_rows([1, 0]))
+    # a crash after the embeddings and half a record line were written
+    with open(tmp_path / "docs" / "embeddings.f32", "ab") as f:
+        f.write(b"\0" * 8)
+    with open(tmp_path / "docs" / "records.jsonl", "a") as f:
+        f.write('{"id": 2, "te')
+
+    reopened = LocalVectorStore("docs", 2, directory=tmp_path)
+    assert [r["id"] for r in reopened._records] == [1]
+
+    ids = reopened.insert(_rows([0, 1], source="b.pdf"))
+    assert [hit["id"] for hit in reopened.search([[0, 1]], top_k=1)[0]] == ids
+    assert LocalVectorStore("docs", 2, directory=tmp_path)._emb.shape == (2, 2)
+    assert (tmp_path / "docs" / "embeddings.f32").stat().st_size == 2 * 2 * 4
@@ -0,0 +1,78 @@
+import time
+
+from backend.utils.metrics import Metrics
+
+
+def test_label_values_are_escaped():
+    m = Metrics()
+    m.inc("replicate_requests_total", model='odd\\model "v2"\nx', stage="generate", status="ok")
+    line = next(l for l in m.render_prometheus().splitlines() if l.startswith("replicate_requests_total{"))
+    assert line == (
+        'replicate_requests_total{model="odd\\\\model \\"v2\\"\\nx",stage="generate",status="ok"} 1.0'
+    )
+
+
+def test_timer_records_latency_and_status():
+    m = Metrics()
+    with m.track("epitome", "model") as call:
+        call.first_token()
+        call.output_tokens = 3
+    snapshot = m.snapshot()
+    assert snapshot["replicate_requests_total"][0]["labels"]["status"] == "ok"
+    assert snapshot["replicate_request_seconds"][0]["count"] == 1
+    assert snapshot["replicate_tokens_total"][0]["value"] == 3
+
+
+class SlowStreamClient:
+    """Fake Replicate client: one output event every ``delay`` seconds."""
+
+    def __init__(self, chunks, delay=0.05):
+        self.chunks = chunks
+        self.delay = delay
+
+    def stream(self, model, input):
+        from replicate.stream import ServerSentEvent
+
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield ServerSentEvent(event="output", data=chunk, id="", retry=None)
+        yield ServerSentEvent(event="done", data="{}", id="", retry=None)
+
+
+def _ttft_and_total(registry, stage):
+    snapshot = registry.snapshot()
+    [ttft] = [s for s in snapshot["replicate_time_to_first_token_seconds"] if s["labels"]["stage"] == stage]
+    [total] = [s for s in snapshot["replicate_request_seconds"] if s["labels"]["stage"] == stage]
+    return ttft["sum"], total["sum"]
+
+
+def test_chat_ttft_is_the_first_event_not_the_whole_reply(temp_db, monkeypatch):
+    from backend.llm import replicate_client_chatbot
+
+    registry = Metrics()
+    monkeypatch.setattr(replicate_client_chatbot, "metrics", registry)
+    chatbot = replicate_client_chatbot.ReplicateClientChatbot(api_token="token")
+    chatbot.client = SlowStreamClient(["Das ", "tut ", "mir ", "leid."])
+
+    reply = "".join(chatbot.stream_response("Ich habe Angst.", system_prompt="Sei nett.", docs=[]))
+
+    assert reply == "Das tut mir leid."
+    ttft, total = _ttft_and_total(registry, "generate")
+    assert ttft < total / 2
+
+
+def test_translate_ttft_is_the_first_event_not_the_whole_reply(monkeypatch):
+    from backend.llm import context_translator
+
+    registry = Metrics()
+    monkeypatch.setattr(context_translator, "metrics", registry)
+    monkeypatch.setattr(
+        context_translator, "get_replicate_client",
+        lambda *args, **kwargs: SlowStreamClient(["I am ", "so ", "sorry."]),
+    )
+
+    translated = context_translator.ContextTranslator("model")._translate_one("Es tut mir leid.", "en")
+
+    assert translated == "I am so sorry."
+    ttft, total = _ttft_and_total(registry, "translate")
+    assert ttft < total / 2
@@ -0,0 +1,34 @@
+import asyncio
+
+from backend.llm import replicate_pool
+
+
+def test_clients_are_pooled_per_token():
+    first = replicate_pool.get_replicate_client("token-a")
+    assert replicate_pool.get_replicate_client("token-a") is first
+    other = replicate_pool.get_replicate_client("token-b")
+    assert other is not first
+    assert other._api_token == "token-b"
+
+
+def test_timeout_override_gets_its_own_client():
+    default = replicate_pool.get_replicate_client("token-a")
+    custom = replicate_pool.get_replicate_client("token-a", (1, 30))
+    assert custom is not default
+    assert replicate_pool.get_replicate_client("token-a", (1, 30)) is custom
+    assert custom._client.timeout.connect == 1
+    assert custom._client.timeout.read == 30
+
+
+def test_async_clients_are_pooled_per_loop_and_token():
+    async def clients():
+        return (
+            replicate_pool.get_async_replicate_client("token-a"),
+            replicate_pool.get_async_replicate_client("token-a"),
+            replicate_pool.get_async_replicate_client("token-b"),
+        )
+
+    a, same, b = asyncio.run(clients())
+    assert a is same
+    assert b is not a
+    assert b._api_token == "token-b"